@@ -14,8 +14,11 @@ import asyncio
 import asyncio as _asyncio
 import uuid
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from datetime import datetime
+from types import MappingProxyType
 from typing import Dict, Any, Optional, List, Union, Tuple
 from src.trading_service_selector import TradingServiceSelector
 from src.automation_coordinator import AutomationCoordinator
@@ -50,6 +53,15 @@ class AgentPriority(Enum):
     HIGH = 2
     CRITICAL = 3
 
+    @property
+    def queue_level(self) -> int:
+        """Default MultiLevelTaskQueue level: 0 interactive, 1 sub-agent, 2 background."""
+        if self is AgentPriority.LOW:
+            return 2
+        if self is AgentPriority.MEDIUM:
+            return 1
+        return 0
+
 
 class AgentTask:
     """Represents a task to be processed by an agent."""
@@ -62,6 +74,7 @@ class AgentTask:
         priority: AgentPriority = AgentPriority.MEDIUM,
         source_agent: Optional[str] = None,
         target_agent: Optional[str] = None,
+        queue_level: Optional[int] = None,
     ):
         """
         Initialize a new agent task.
@@ -73,6 +86,7 @@ class AgentTask:
             priority: Task priority
             source_agent: Agent that created the task
             target_agent: Agent that should process the task
+            queue_level: Explicit MultiLevelTaskQueue level (defaults to the priority's level)
         """
         self.task_id = task_id
         self.task_type = task_type
@@ -80,6 +94,9 @@ class AgentTask:
         self.priority = priority
         self.source_agent = source_agent
         self.target_agent = target_agent
+        self.queue_level = (
+            priority.queue_level if queue_level is None else queue_level
+        )
         self.created_at = datetime.now()
         self.started_at = None
         self.completed_at = None
@@ -128,6 +145,98 @@ class AgentTask:
         return task
 
 
+class MultiLevelTaskQueue:
+    """
+    Three-level task queue: 0 interactive (OI helpers), 1 sub-agent, 2 background.
+
+    Drop-in replacement for the PriorityQueue agents used to hold
+    ``(priority, task)`` tuples. ``get`` always serves the highest non-empty
+    level, and entries that have waited longer than ``boost_after`` seconds are
+    promoted one level so background work cannot starve.
+    """
+
+    LEVELS = 3
+
+    def __init__(self, boost_after: float = 10.0):
+        """
+        Initialize the queue.
+
+        Args:
+            boost_after: Seconds an entry may wait before being moved up a level
+        """
+        self.boost_after = boost_after
+        self._queues = [deque() for _ in range(self.LEVELS)]
+        self._cond = threading.Condition()
+        self._unfinished = 0
+        self._last_boost = time.monotonic()
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None):
+        """Enqueue a ``(priority, task)`` tuple on the task's queue level."""
+        task = item[1]
+        level = getattr(task, "queue_level", None)
+        if level is None:
+            level = task.priority.queue_level
+        level = min(max(int(level), 0), self.LEVELS - 1)
+        with self._cond:
+            self._queues[level].append((time.monotonic(), item))
+            self._unfinished += 1
+            self._cond.notify()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None):
+        """Dequeue from the highest-priority non-empty level."""
+        with self._cond:
+            if block:
+                if not self._cond.wait_for(self._has_items, timeout):
+                    raise queue.Empty
+            elif not self._has_items():
+                raise queue.Empty
+
+            if time.monotonic() - self._last_boost >= self.boost_after:
+                self.boost_priorities()
+
+            for q in self._queues:
+                if q:
+                    return q.popleft()[1]
+
+    def boost_priorities(self) -> int:
+        """
+        Promote entries that have waited longer than ``boost_after`` by one level.
+
+        Returns:
+            int: Number of entries promoted
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._last_boost = now
+            promoted = 0
+            for level in range(1, self.LEVELS):
+                q = self._queues[level]
+                while q and now - q[0][0] >= self.boost_after:
+                    # Re-stamp so a promoted entry waits a full period before the next boost
+                    self._queues[level - 1].append((now, q.popleft()[1]))
+                    promoted += 1
+            return promoted
+
+    def task_done(self):
+        """Mark a previously dequeued task as processed."""
+        with self._cond:
+            if self._unfinished <= 0:
+                raise ValueError("task_done() called too many times")
+            self._unfinished -= 1
+
+    def qsize(self) -> int:
+        """Return the number of queued entries across all levels."""
+        with self._cond:
+            return sum(len(q) for q in self._queues)
+
+    def empty(self) -> bool:
+        """Return True if no entries are queued."""
+        return self.qsize() == 0
+
+    def _has_items(self) -> bool:
+        return any(self._queues)
+
+
 class BaseAgent:
     """Base class for all agents in the system."""
 
@@ -151,11 +260,14 @@ class BaseAgent:
         """
         self.agent_id = agent_id
         self.agent_type = agent_type
-        self.task_queue = task_queue or queue.PriorityQueue()
+        self.task_queue = task_queue or MultiLevelTaskQueue()
         self.result_queue = result_queue or queue.Queue()
         self.config = config or {}
         self.running = False
         self.thread = None
+        # When set, the processing thread is started on the first add_task call
+        self.lazy_start = False
+        self._start_lock = threading.Lock()
         self.logger = logging.getLogger(f"Grace{agent_type.value.capitalize()}Agent")
 
         # Initialize supported task types
@@ -163,16 +275,27 @@ class BaseAgent:
 
     def start(self):
         """Start the agent processing loop."""
-        if self.running:
+        if not self._start_thread():
             self.logger.warning(f"Agent {self.agent_id} is already running")
             return
-
-        self.running = True
-        self.thread = threading.Thread(target=self._process_loop)
-        self.thread.daemon = True
-        self.thread.start()
         self.logger.info(f"Agent {self.agent_id} started")
 
+    def _ensure_started(self):
+        """Start the processing loop if it is not running yet."""
+        if not self.running and self._start_thread():
+            self.logger.info(f"Agent {self.agent_id} started on first task")
+
+    def _start_thread(self) -> bool:
+        """Spawn the processing thread; returns False if it was already running."""
+        with self._start_lock:
+            if self.running:
+                return False
+            self.running = True
+            self.thread = threading.Thread(target=self._process_loop)
+            self.thread.daemon = True
+            self.thread.start()
+            return True
+
     def stop(self):
         """Stop the agent processing loop."""
         self.running = False
@@ -188,6 +311,9 @@ class BaseAgent:
         Args:
             task: Task to add
         """
+        if self.lazy_start:
+            self._ensure_started()
+
         # Add task to queue with priority
         self.task_queue.put((task.priority.value, task))
         self.logger.debug(f"Added task {task.task_id} to queue")
@@ -202,6 +328,12 @@ class BaseAgent:
                 except queue.Empty:
                     continue
 
+                # Skip tasks whose synchronous caller already gave up on them
+                if task.status == "timeout":
+                    self.logger.info(f"Dropping timed-out task {task.task_id}")
+                    self.task_queue.task_done()
+                    continue
+
                 # Process task
                 self.logger.info(
                     f"Processing task {task.task_id} of type {task.task_type}"
@@ -1945,8 +2077,10 @@ class SystemAgentManager:
 
         # Initialize agents
         self.agents = {}
-        # Dictionary to map task types to agents
-        self.task_type_to_agent = {}
+        # Read-only mapping of task types to agents. Registration swaps in a new
+        # snapshot (copy-on-write) so dispatch paths can read it without locking.
+        self.task_type_to_agent = MappingProxyType({})
+        self._registry_lock = threading.Lock()
         # Dictionary to store task status and results
         self.tasks = {}
         self._initialize_agents()
@@ -1975,12 +2109,22 @@ class SystemAgentManager:
         self.result_thread.daemon = True
         self.result_thread.start()
 
-        # Initialize scheduled tasks
+        # Initialize scheduled tasks. Only the scheduler thread touches scheduled_tasks;
+        # other threads hand new entries over through the inbox.
         self.scheduled_tasks = {}
+        self._schedule_inbox: "queue.SimpleQueue[Tuple[str, Dict[str, Any]]]" = queue.SimpleQueue()
         self.scheduler_thread = None
         self.last_schedule_run = time.time()
         # Idempotent locks: lock_key -> last_acquired_ts
         self.scheduler_locks: Dict[str, float] = {}
+        # Service-backed scheduled tasks run off the scheduler thread; a task that is
+        # still in flight when it comes due again is skipped rather than queued
+        self._scheduled_inflight = set()
+        self._scheduled_executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="scheduled-task"
+        )
+        # task_id -> Event set when a process_task_sync waiter's result arrives
+        self._task_events: Dict[str, threading.Event] = {}
 
     def register_automation_tick(
         self,
@@ -1997,7 +2141,7 @@ class SystemAgentManager:
         Returns the scheduled task id.
         """
         task_id = f"auto:{user_id}:{strategy_id}:{market or 'ANY'}:{timeframe}"
-        self.scheduled_tasks[task_id] = {
+        self._schedule_inbox.put_nowait((task_id, {
             "task_type": "automation_tick",
             "content": {
                 "user_id": user_id,
@@ -2009,7 +2153,7 @@ class SystemAgentManager:
             "last_run": 0.0,
             "lock_key": task_id,
             "lock_ttl": float(lock_ttl) if lock_ttl is not None else max(1.0, float(interval) / 2.0),
-        }
+        }))
         self.logger.info(f"Registered automation_tick schedule: {task_id}")
         return task_id
 
@@ -2059,9 +2203,20 @@ class SystemAgentManager:
         # Start scheduler thread
         self._start_scheduler()
 
+    def prepare_agents(self):
+        """Prepare agents for on-demand startup.
+
+        Unlike start_all_agents, no processing threads are spawned here; each
+        agent starts its loop the first time a task is routed to it.
+        """
+        for agent in self.agents.values():
+            agent.lazy_start = True
+        self.logger.info(f"Prepared {len(self.agents)} agents for on-demand startup")
+
     def stop_all_agents(self):
         """Stop all agents."""
         for agent_id, agent in self.agents.items():
+            agent.lazy_start = False
             agent.stop()
             self.logger.info(f"Stopped agent {agent_id}")
 
@@ -2075,6 +2230,7 @@ class SystemAgentManager:
         if self.scheduler_thread:
             self.scheduler_thread.join(timeout=5.0)
             self.scheduler_thread = None
+        self._scheduled_executor.shutdown(wait=False)
 
     def register_agent_for_task_type(
         self,
@@ -2099,10 +2255,13 @@ class SystemAgentManager:
             )
             return
 
-        self.task_type_to_agent[task_type] = {
-            "service": target_service,
-            "priority": priority,
-        }
+        with self._registry_lock:
+            registry = dict(self.task_type_to_agent)
+            registry[task_type] = {
+                "service": target_service,
+                "priority": priority,
+            }
+            self.task_type_to_agent = MappingProxyType(registry)
         self.logger.info(f"Registered agent for task type: {task_type}")
 
     def get_task_status(self, task_id: str):
@@ -2128,6 +2287,32 @@ class SystemAgentManager:
             error=self.tasks[task_id].get("error", None),
         )
 
+    def wait_for_task(self, task_id: str, timeout: float):
+        """
+        Block until a task reaches a terminal state or the timeout expires.
+
+        Completion is signalled by the result processor, so no polling is involved.
+
+        Args:
+            task_id: ID returned by create_task
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            The task status object from get_task_status
+        """
+        terminal = ("completed", "failed", "error")
+        if self.get_task_status(task_id).status in terminal:
+            return self.get_task_status(task_id)
+
+        done = self._task_events.setdefault(task_id, threading.Event())
+        try:
+            # Re-check: the result may have landed before the event was registered
+            if self.get_task_status(task_id).status not in terminal:
+                done.wait(timeout)
+        finally:
+            self._task_events.pop(task_id, None)
+        return self.get_task_status(task_id)
+
     def create_task(
         self,
         task_type: str,
@@ -2135,6 +2320,7 @@ class SystemAgentManager:
         priority: AgentPriority = AgentPriority.MEDIUM,
         source_agent: Optional[str] = None,
         target_agent: Optional[str] = None,
+        queue: Optional[int] = None,
     ) -> str:
         """
         Create and route a new task.
@@ -2145,6 +2331,8 @@ class SystemAgentManager:
             priority: Task priority
             source_agent: Agent that created the task
             target_agent: Agent that should process the task
+            queue: Agent queue level (0 interactive, 1 sub-agent, 2 background);
+                defaults to the level implied by priority
 
         Returns:
             Task ID
@@ -2152,6 +2340,49 @@ class SystemAgentManager:
         # Run task cleanup if needed
         self.cleanup_tasks()
 
+        return self._submit_task(
+            task_type, content, priority, source_agent, target_agent, queue
+        )
+
+    def create_tasks(self, batch: List[Dict[str, Any]]) -> List[str]:
+        """
+        Create and route several tasks at once.
+
+        Cleanup runs once for the whole batch rather than once per task.
+
+        Args:
+            batch: Task specs, each with the create_task keyword arguments
+                (task_type, content and optionally priority, source_agent,
+                target_agent, queue)
+
+        Returns:
+            List of task IDs, in batch order
+        """
+        self.cleanup_tasks()
+        task_ids = [
+            self._submit_task(
+                spec["task_type"],
+                spec["content"],
+                spec.get("priority", AgentPriority.MEDIUM),
+                spec.get("source_agent"),
+                spec.get("target_agent"),
+                spec.get("queue"),
+            )
+            for spec in batch
+        ]
+        self.logger.info(f"Created {len(task_ids)} tasks in one batch")
+        return task_ids
+
+    def _submit_task(
+        self,
+        task_type: str,
+        content: Dict[str, Any],
+        priority: AgentPriority,
+        source_agent: Optional[str],
+        target_agent: Optional[str],
+        queue: Optional[int],
+    ) -> str:
+        """Create a task, record it and hand it to its service or an agent."""
         # Increment task ID counter
         self.task_id_counter += 1
         task_id = str(self.task_id_counter)
@@ -2164,6 +2395,7 @@ class SystemAgentManager:
             priority=priority,
             source_agent=source_agent,
             target_agent=target_agent,
+            queue_level=queue,
         )
 
         # Store task in tasks dictionary
@@ -2193,10 +2425,10 @@ class SystemAgentManager:
                 )
 
         # If no registered service or processing failed, use the router
-        target_agent_id = self.router.route_task(task)
-        if target_agent_id and target_agent_id in self.agents:
-            self.agents[target_agent_id].add_task(task)
-            self.logger.info(f"Routed task {task_id} to agent {target_agent_id}")
+        # (route_task enqueues the task on the chosen agent itself)
+        if self.router.route_task(task):
+            self.tasks[task_id]["status"] = "pending"
+            self.logger.info(f"Routed task {task_id} to an agent")
         else:
             self.tasks[task_id]["status"] = "error"
             self.tasks[task_id]["error"] = "Could not route task to any agent"
@@ -2215,9 +2447,15 @@ class SystemAgentManager:
                 # Update task status if task_id is provided
                 task_id = result.get("task_id")
                 if task_id and task_id in self.tasks:
-                    self.tasks[task_id]["status"] = "completed"
+                    status = result.get("status", "completed")
+                    self.tasks[task_id]["status"] = status
                     self.tasks[task_id]["result"] = result.get("data", {})
+                    if status == "failed":
+                        self.tasks[task_id]["error"] = (result.get("data") or {}).get("error")
                     self.tasks[task_id]["completed_at"] = datetime.now()
+                    event = self._task_events.get(task_id)
+                    if event is not None:
+                        event.set()
 
                 # Process result
                 if result.get("event") == "memory_added":
@@ -2356,13 +2594,13 @@ class SystemAgentManager:
             priority: Task priority
         """
         task_id = f"scheduled_{task_type}_{uuid.uuid4().hex[:8]}"
-        self.scheduled_tasks[task_id] = {
+        self._schedule_inbox.put_nowait((task_id, {
             "task_type": task_type,
             "content": content,
             "interval": int(interval_seconds),
             "priority": priority,
             "last_run": 0.0,  # Never run yet
-        }
+        }))
         self.logger.info(
             f"Scheduled task {task_id} of type {task_type} to run every {interval_seconds} seconds"
         )
@@ -2395,6 +2633,14 @@ class SystemAgentManager:
             try:
                 current_time = time.time()
 
+                # Pick up tasks scheduled since the last tick
+                while True:
+                    try:
+                        stask_id, task_info = self._schedule_inbox.get_nowait()
+                    except queue.Empty:
+                        break
+                    self.scheduled_tasks[stask_id] = task_info
+
                 # Cleanup expired locks
                 try:
                     for k, ts in list(self.scheduler_locks.items()):
@@ -2430,22 +2676,21 @@ class SystemAgentManager:
                                 task_id=f"scheduled_{stask_id}_{int(current_time)}",
                                 task_type=task_info["task_type"],
                                 content=task_info["content"],
-                                priority=AgentPriority.MEDIUM,
+                                priority=task_info.get("priority", AgentPriority.LOW),
                                 source_agent="SystemScheduler",
                                 target_agent=None,
                             )
                             if task_info["task_type"] in self.task_type_to_agent:
                                 service = self.task_type_to_agent[task_info["task_type"]]["service"]
-                                try:
-                                    # Process the task with the registered service
-                                    result = service.process_task(scheduled_task.content)
+                                if stask_id in self._scheduled_inflight:
                                     self.logger.info(
-                                        f"Processed scheduled task {stask_id} with result: {result}"
-                                    )
-                                except Exception as e:
-                                    self.logger.error(
-                                        f"Error processing scheduled task {stask_id}: {str(e)}"
+                                        f"Skipping scheduled task {stask_id}: previous run still in progress"
                                     )
+                                    continue
+                                self._scheduled_inflight.add(stask_id)
+                                self._scheduled_executor.submit(
+                                    self._run_scheduled_service, stask_id, service, scheduled_task
+                                )
                             else:
                                 # Use the router if no direct service is available
                                 if not self.router.route_task(scheduled_task):
@@ -2464,6 +2709,24 @@ class SystemAgentManager:
 
         self.logger.info("Scheduler thread stopped")
 
+    def _run_scheduled_service(self, stask_id: str, service: Any, task: AgentTask):
+        """
+        Run a scheduled task with its registered service on a worker thread.
+
+        Args:
+            stask_id: Scheduled task ID, cleared from the in-flight set when done
+            service: Registered service for the task type
+            task: Task instance for this run
+        """
+        try:
+            # Process the task with the registered service
+            result = service.process_task(task.content)
+            self.logger.info(f"Processed scheduled task {stask_id} with result: {result}")
+        except Exception as e:
+            self.logger.error(f"Error processing scheduled task {stask_id}: {str(e)}")
+        finally:
+            self._scheduled_inflight.discard(stask_id)
+
     def process_task_sync(self, task: AgentTask, timeout: int = 30) -> Dict[str, Any]:
         """
         Process a task synchronously and return the result.
@@ -2502,34 +2765,39 @@ class SystemAgentManager:
                     )
                     # Continue to try routing the task
 
-            # If no registered service or processing failed, use the router
-            if not self.router.route_task(task):
-                self.logger.error(f"Could not route task {task.task_id} to any agent")
-                return {"error": "Could not route task to any agent", "status": "error"}
-
-            # Store task in tasks dictionary
+            # Store task before routing so a fast agent's result is not dropped
             self.tasks[task.task_id] = {
                 "status": "pending",
                 "task": task,
                 "created_at": datetime.now(),
             }
+            done = self._task_events[task.task_id] = threading.Event()
 
-            # Wait for task completion
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                task_status = self.get_task_status(task.task_id)
-
-                if task_status.status == "completed":
-                    # Return the result
-                    return task_status.result
-                elif task_status.status == "failed" or task_status.status == "error":
+            try:
+                # If no registered service or processing failed, use the router
+                if not self.router.route_task(task):
+                    self.tasks.pop(task.task_id, None)
+                    self.logger.error(f"Could not route task {task.task_id} to any agent")
+                    return {"error": "Could not route task to any agent", "status": "error"}
+
+                # Block until the result processor signals completion (or timeout)
+                if done.wait(timeout):
+                    task_status = self.get_task_status(task.task_id)
+                    if task_status.status == "completed":
+                        # Return the result
+                        return task_status.result
                     # Return error information
                     return {"error": task_status.error, "status": "error"}
-
-                # Small delay before checking again
-                time.sleep(0.5)
-
-            # Handle timeout
+            finally:
+                self._task_events.pop(task.task_id, None)
+
+            # Handle timeout. Mark the task so the agent drops it if it is still
+            # queued rather than running work nobody is waiting for.
+            task.status = "timeout"
+            task_info = self.tasks.get(task.task_id)
+            if task_info is not None:
+                task_info["status"] = "error"
+                task_info["error"] = "Task processing timed out"
             self.logger.warning(f"Task {task.task_id} processing timed out")
             return {"error": "Task processing timed out", "status": "timeout"}
 
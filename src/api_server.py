@@ -5073,6 +5073,7 @@ async def shutdown():
     """Clean up resources on shutdown."""
     # Session persistence disabled: do not save sessions on shutdown
     logger.info("Session persistence disabled: not saving sessions on shutdown")
+    grace_instance.gmgn_service.close()
 
 @app.route("/api/logs", methods=["GET"])
 async def get_client_logs():
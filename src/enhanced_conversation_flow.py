@@ -481,8 +481,10 @@ class EnhancedConversationFlow:
                 self.logger.debug(f"Calling async function {func.__name__}")
                 return await func(*args, **kwargs)
             else:
+                # Run blocking callables (e.g. interpreter.chat) off the event loop,
+                # which is shared by every conversation
                 self.logger.debug(f"Calling sync function {func.__name__}")
-                return func(*args, **kwargs)
+                return await asyncio.to_thread(func, *args, **kwargs)
         except Exception as e:
             self.logger.error(f"Error calling function {getattr(func, '__name__', 'unknown')}: {str(e)}")
             self.logger.error(traceback.format_exc())
@@ -13,6 +13,7 @@ import random
 import requests
 import threading
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, auto
 from typing import Dict, List, Any, Optional, Union, Tuple, TypedDict
 from datetime import datetime, timedelta
@@ -113,6 +114,10 @@ class GMGNService:
         self.cache_duration = cache_duration
         self.config = config or {}
         self.cache = {}
+        # Shared by price_check_batch to fan out per-token price lookups
+        self._price_pool = ThreadPoolExecutor(
+            max_workers=8, thread_name_prefix="gmgn-price"
+        )
 
         # GMGN API endpoints
         self.trade_endpoint = "https://gmgn.ai/defi/router/v1/sol/tx"
@@ -159,6 +164,10 @@ class GMGNService:
             self.logger.info(f"Solana WS URL: {self.solana_ws_url}")
         self.logger.info(f"Solana network: {self.solana_network}")
 
+    def close(self):
+        """Release the service's worker threads."""
+        self._price_pool.shutdown(wait=False)
+
     def setup_auto_trading(
         self,
         user_id: str,
@@ -1563,6 +1572,7 @@ class GMGNService:
         SUPPORTED_TASK_TYPES = [
             "get_token_price",
             "price_check",
+            "price_check_batch",
             "check_wallet_balance",
             "execute_trade",
             "execute_swap",
@@ -1617,6 +1627,31 @@ class GMGNService:
                 result["status"] = "success"
             return result
 
+        elif task_type == "price_check_batch":
+            symbols = task_content.get("symbols") or []
+            if not symbols:
+                self.logger.error("At least one token symbol is required for batch price check")
+                return {"status": "error", "message": "At least one token symbol is required"}
+
+            chain = task_content.get("chain", "sol")
+            timeframe = task_content.get("timeframe", "1d")
+            user_id = task_content.get("user_id")
+
+            # The price endpoint is per token, so fan the lookups out concurrently
+            results = list(
+                self._price_pool.map(
+                    lambda token: self.get_token_price(token, chain, timeframe, user_id),
+                    symbols,
+                )
+            )
+
+            prices = {}
+            for token, result in zip(symbols, results):
+                if isinstance(result, dict) and "status" not in result:
+                    result["status"] = "success"
+                prices[token] = result
+            return {"status": "success", "prices": prices}
+
         elif task_type == "check_wallet_balance":
             wallet_address = task_content.get("wallet_address")
             user_id = task_content.get("user_id")
@@ -1,32 +1,46 @@
 import os
 import time
-import sys
 import json
 import logging
 import asyncio
-import importlib.util
-from typing import Dict, List, Any, Optional, Union
-import re
+import contextvars
+import functools
+import inspect
+import sys
+from typing import Callable, Dict, Any, List, Optional
 import threading
-import queue
 import traceback
-from concurrent.futures import ThreadPoolExecutor
 import uuid
+from collections import OrderedDict, deque
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import MappingProxyType
+from dataclasses import dataclass, field
+
+# orjson is optional; fall back to the stdlib parser when it isn't installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 # Assuming these imports are correct based on the provided files
 from src.memory_system import MemorySystem
-from src.config import get_config
 from src.system_prompts import get_system_prompt
-from src.agent_framework import SystemAgentManager, AgentPriority
+from src.agent_framework import SystemAgentManager, AgentPriority, AgentTask
 from src.user_profile import SecureDataManager, UserProfileSystem
 from src.gmgn_service import GMGNService
 from src.solana_wallet import SolanaWalletManager
 from src.transaction_confirmation import TransactionConfirmationSystem
 from src.research_service import ResearchService
-from src.conversation_management_wrapper import ConversationManager, create_conversation_management_system
+from src.conversation_management_wrapper import ConversationManager
 from src.leverage_trading_handler import LeverageTradeManager
 from src.social_media_service import SocialMediaService
 
+# get_system_prompt rebuilds its f-string on every call; memoize it per context
+_prompt = functools.lru_cache(maxsize=8)(get_system_prompt)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,10 +48,504 @@ logging.basicConfig(
 )
 logger = logging.getLogger("GraceCore")
 
+DEFAULT_ENCRYPTION_KEY = 'dGhpc19pc19hX3Byb3Blcl8zMl9ieXRlX2Zlcm5ldF9rZXk='
+
+# Constant OI helper error payloads; callers return a copy
+_ERR_NO_SYMBOL = MappingProxyType({"error": "Token symbol is required", "status": "error"})
+_ERR_NO_SYMBOLS = MappingProxyType({"error": "At least one token symbol is required", "status": "error"})
+_ERR_NO_USER = MappingProxyType({"error": "User ID is required", "status": "error"})
+_ERR_NO_CONFIRMATION = MappingProxyType({"error": "Confirmation ID is required", "status": "error"})
+_ERR_NO_TX_HASH = MappingProxyType({"error": "Transaction hash is required", "status": "error"})
+_ERR_NO_CALLBACK_ARGS = MappingProxyType({"error": "Transaction ID and signature are required", "status": "error"})
+
+# User whose request is being handled. A ContextVar instead of an instance attribute so
+# concurrent sessions calling OI helpers don't see each other's user id.
+_current_user_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "grace_current_user_id", default=None
+)
+
+# System message for the agent-framework path; removed Twitter reference as requested
+_GRACE_SYSTEM_MESSAGE = (
+    "You are Grace, an AI assistant based on Open Interpreter with crypto trading capabilities.\n\n"
+    "Your capabilities include:\n"
+    "1. Accessing and recalling information from a three-layer memory system\n"
+    "2. Trading cryptocurrencies on the Solana blockchain via GMGN\n"
+    "3. Performing web research on various topics\n"
+    "4. Managing user wallets (both internal and Phantom)\n"
+    "5. Executing code to perform various tasks\n\n"
+    "When users ask about trading or wallet operations, always use the transaction confirmation "
+    "system to ensure secure execution with explicit user approval.\n\n"
+    "Special commands:\n"
+    "- !grace.learn [information] - Add information to your long-term memory (admin only)\n"
+    "- !grace.remember [query] - Search your memory for relevant information\n"
+    "- !grace.wallet - Show wallet information\n"
+    "- !grace.trade - Initiate a trading operation\n"
+    "- !grace.research [topic] - Perform web research on the specified topic\n\n"
+    "Always be helpful, accurate, and prioritize user security when dealing with financial transactions."
+)
+
+# Open Interpreter system message: the Grace message plus crypto-handling guidance.
+# Kept byte-identical across conversations so provider prompt caching can reuse it.
+_OI_SYSTEM_MESSAGE = _GRACE_SYSTEM_MESSAGE + """
+
+When users ask about cryptocurrency prices, trading, or wallet information:
+1. Respond naturally in a conversational manner
+2. If they ask about prices, mention you're checking the latest data
+3. If they ask about trading, explain the process clearly
+4. Always maintain context from previous messages
+
+You are designed to work with a specialized agent framework that handles crypto operations.
+"""
+
+# Keys (or attributes, for response objects) checked, in order, for reply text
+_RESPONSE_TEXT_KEYS = ("content", "message", "text", "response")
+
+# Open Interpreter conversation buffer: messages kept per user (10 turns of
+# history plus the current message) and number of users tracked
+_OI_BUFFER_MESSAGES = 11
+_OI_BUFFER_MAX_USERS = 1024
+
+# interpreter.chat worker threads and how long process_message waits on one.
+# A timed-out call keeps its worker until chat returns, so new calls skip the
+# interpreter while every worker is still busy.
+_INTERP_WORKERS = 4
+_INTERP_TIMEOUT = 30
+
+
+def _to_oi_message(msg: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize a stored conversation message into Open Interpreter's format."""
+    if "role" in msg:
+        role = msg["role"]
+    elif "type" in msg:
+        # Map type to role if possible
+        role = "user" if msg["type"] == "message" else "system"
+    else:
+        role = "user"
+    validated = {"role": role, "content": msg.get("content", ""), "type": "message"}
+    # Copy any other fields
+    for key, value in msg.items():
+        validated.setdefault(key, value)
+    return validated
+
+_UNFORMATTED_REPLY = "I processed your request but couldn't format the response properly."
+
+
+def _text_from_response_list(response: list) -> str:
+    """Join the assistant text of a streamed (list) Open Interpreter response."""
+    # Collect parts and join once
+    parts = []
+    for i, chunk in enumerate(response):
+        try:
+            if not isinstance(chunk, dict):
+                continue
+            if chunk.get("role") == "assistant":
+                content = chunk.get("content", "")
+                if content:
+                    parts.append(str(content))
+            else:
+                # Try to extract content from other dict formats
+                text = next((chunk[key] for key in _RESPONSE_TEXT_KEYS if chunk.get(key)), None)
+                if text is not None:
+                    parts.append(str(text))
+        except Exception as chunk_error:
+            logger.error(f"Error processing chunk {i}: {str(chunk_error)}")
+    response_text = "".join(parts)
+
+    if not response_text:
+        logger.warning("Could not extract text from list response")
+        # Try to convert the whole response to string as a fallback
+        try:
+            response_text = str(response)
+        except Exception:
+            response_text = _UNFORMATTED_REPLY
+    return response_text
+
+
+def _text_from_response_dict(response: dict) -> str:
+    """Pull the reply text out of a single (dict) Open Interpreter response."""
+    response_text = next((str(response[key]) for key in _RESPONSE_TEXT_KEYS if response.get(key)), None)
+    if response_text is None:
+        # If no content found, log the keys and use a default message
+        logger.warning(f"No content found in response dict. Keys: {list(response.keys())}")
+        response_text = "I processed your request but couldn't find the response content."
+    return response_text
+
+
+def _text_from_response_object(response: Any) -> str:
+    """Pull the reply text from an object exposing content/message/text/response."""
+    response_text = next(
+        (str(getattr(response, attr)) for attr in _RESPONSE_TEXT_KEYS if getattr(response, attr, None)),
+        None,
+    )
+    if response_text is None:
+        # Handle any other response format
+        logger.warning(f"Unknown response type: {type(response)}")
+        try:
+            response_text = str(response)
+            if not response_text or response_text == str(type(response)):
+                response_text = _UNFORMATTED_REPLY
+        except Exception:
+            response_text = _UNFORMATTED_REPLY
+    return response_text
+
+
+def _text_from_no_response(response: None) -> str:
+    """Fallback reply when Open Interpreter returned nothing."""
+    logger.warning("Open Interpreter returned None response")
+    return "I'm sorry, I couldn't generate a response."
+
+
+# OI returns plain lists and dicts, so dispatch on the exact type
+_OI_RESPONSE_EXTRACTORS = {
+    list: _text_from_response_list,
+    dict: _text_from_response_dict,
+    type(None): _text_from_no_response,
+}
+
+
+def _extract_oi_response(response: Any) -> str:
+    """Turn whatever Open Interpreter's chat() returned into reply text."""
+    extractor = _OI_RESPONSE_EXTRACTORS.get(type(response))
+    if extractor is None:
+        # Subclasses of list/dict are rare; everything else is an object
+        if isinstance(response, list):
+            extractor = _text_from_response_list
+        elif isinstance(response, dict):
+            extractor = _text_from_response_dict
+        else:
+            extractor = _text_from_response_object
+    try:
+        return extractor(response)
+    except Exception as format_error:
+        logger.error(f"Error formatting response: {str(format_error)}")
+        return "I processed your request but encountered an issue formatting the response."
+
+
+# !grace.learn tasks allowed in flight at HIGH priority; further ones queue at
+# MEDIUM (and age back up) so admin bursts can't monopolize the HIGH level.
+# Tasks with no result after _LEARN_TASK_MAX_AGE seconds stop counting.
+_LEARN_HIGH_PRIORITY_SLOTS = 2
+_LEARN_TASK_MAX_AGE = 300.0
+_TERMINAL_TASK_STATUSES = ("completed", "failed", "error", "unknown")
+
+# Special commands look like "!grace.<command> [argument]"
+_SPECIAL_COMMAND_PREFIX = "!grace."
+
+# Helper list appended to the OI system message when functions are exposed as attributes
+_OI_FUNCTION_INFO = """\
+You have access to the following helper functions:
+- check_token_price(token_symbol): Get the current price of a cryptocurrency token
+- check_token_prices(symbols): Get current prices for several tokens in one call; prefer this over
+  repeated check_token_price calls when the user asks about more than one token
+- check_wallet_balance(user_id=None): Get the current wallet balance for a user
+- prepare_trade(from_token, to_token, amount=None): Prepare a trade between two tokens
+- get_market_sentiment(token=None): Get the current market sentiment for a token or the overall market
+- confirm_transaction(confirmation_id, user_id=None): Confirm a pending transaction
+- cancel_transaction(confirmation_id, user_id=None): Cancel a pending transaction
+- get_pending_transactions(user_id=None): Get all pending transactions for a user
+- check_transaction_status(transaction_hash): Check the status of a transaction on the blockchain
+- process_phantom_callback(transaction_id, signature): Process callback from Phantom wallet after transaction approval
+- check_token_price_async, check_wallet_balance_async, get_market_sentiment_async: Same as above but return a
+  concurrent.futures.Future; call .result() or concurrent.futures.wait() to run independent lookups in parallel
+
+Use these functions when appropriate to provide accurate information to the user.
+"""
+
+
+@functools.lru_cache(maxsize=512)
+def _intern_symbol(raw: str) -> str:
+    return sys.intern(raw.upper().strip())
+
+
+def _normalize_symbol(value) -> str:
+    """Upper-case, strip and intern a token symbol, reusing results for repeat inputs."""
+    return _intern_symbol(value if type(value) is str else str(value))
+
+
+@dataclass(slots=True, frozen=True)
+class _Cfg:
+    """Config values resolved once at startup so init code reads attributes instead of dict lookups."""
+    data_dir: str
+    encryption_key: str
+    mango_url: str
+    mango_private_key_path: Optional[str]
+    gmgn_router_endpoint: Optional[str]
+    gmgn_price_endpoint: Optional[str]
+    solana_rpc_url: Optional[str]
+    solana_network: Optional[str]
+    phantom_app_url: str
+    phantom_callback_path: str
+    jwt_secret: str
+    memory_pruning_interval: int
+    social_media_cache_duration: int
+    transaction_confirmation: Dict[str, Any] = field(default_factory=dict)
+    leverage_trading: Dict[str, Any] = field(default_factory=dict)
+    social_media: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "_Cfg":
+        """Build the resolved config from the merged configuration dict."""
+        get = config.get
+        return cls(
+            data_dir=get("data_dir", os.path.join(os.getcwd(), "data")),
+            encryption_key=get("encryption_key", os.environ.get('FERNET_KEY', DEFAULT_ENCRYPTION_KEY)),
+            mango_url=get("mango_v3_endpoint") or "http://localhost:8080",
+            mango_private_key_path=get("mango_private_key_path"),
+            gmgn_router_endpoint=get("gmgn_router_endpoint"),
+            gmgn_price_endpoint=get("gmgn_price_endpoint"),
+            solana_rpc_url=get("solana_rpc_url"),
+            solana_network=get("solana_network"),
+            phantom_app_url=get("phantom_app_url", "https://phantom.app"),
+            phantom_callback_path=get("phantom_callback_path", "/phantom/callback"),
+            jwt_secret=get("jwt_secret", "grace_default_jwt_secret"),
+            memory_pruning_interval=int(get("memory_pruning_interval", 3600)),
+            social_media_cache_duration=int(get("social_media_cache_duration", 3600)),
+            transaction_confirmation=get("transaction_confirmation", {}),
+            leverage_trading=get("leverage_trading", {}),
+            social_media=get("social_media", {}),
+        )
+
+
+class _NullService:
+    """Stand-in for an optional service that failed to initialize.
+
+    It is falsy, so existing ``if self.research_service:`` style guards keep
+    working, and any method call returns an error payload instead of raising.
+    """
+    __slots__ = ("name", "reason")
+
+    def __init__(self, name: str, reason: str):
+        self.name = name
+        self.reason = reason
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __getattr__(self, attr: str):
+        def _unavailable(*args, **kwargs) -> Dict[str, Any]:
+            return {"error": f"{self.name} is unavailable: {self.reason}", "status": "error"}
+        return _unavailable
+
+
+class _TokenBucket:
+    """Thread-safe token bucket with AIMD rate adjustment.
+
+    The refill rate is halved whenever the upstream reports throttling and
+    recovers additively (back up to the configured rate) on each success.
+    """
+    __slots__ = ("base_rate", "rate", "burst", "_tokens", "_stamp", "_clock", "_lock")
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._clock = clock
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """Take ``tokens`` tokens (capped at the burst size) if available; never blocks."""
+        need = min(float(tokens), self.burst)
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= need:
+                self._tokens -= need
+                return True
+            return False
+
+    def retry_after(self, tokens: int = 1) -> float:
+        """Seconds until ``tokens`` tokens become available."""
+        need = min(float(tokens), self.burst)
+        with self._lock:
+            self._refill(self._clock())
+            return round(max(0.0, (need - self._tokens) / self.rate), 3)
+
+    def backoff(self) -> None:
+        """Multiplicative decrease after an upstream 429."""
+        with self._lock:
+            self.rate = max(self.base_rate / 16.0, self.rate / 2.0)
+
+    def recover(self) -> None:
+        """Additive increase after a successful upstream call."""
+        with self._lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate / 10.0)
+
+
+class _ResponseCache:
+    """Short-lived per-session cache of replies for repeated messages.
+
+    Only exact repeats are served, keyed by (user_id, session_id, normalized
+    message). Each entry also remembers the session's last turn before and
+    after it was answered, and is only served while the session is still in
+    one of those states, so a repeat never picks up a reply given in another
+    conversational context.
+    """
+    __slots__ = ("ttl", "max_entries", "_exact", "_last_turn", "_lock")
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._exact: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # (user_id, session_id) -> hash of the session's last (message, reply)
+        self._last_turn: "OrderedDict[tuple, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(message: str) -> str:
+        return " ".join(message.lower().split())
+
+    def lookup(self, user_id: str, session_id: str, message: str) -> Optional[str]:
+        """Return the cached reply for a recent identical message, or None."""
+        key = (user_id, session_id, self._normalize(message))
+        now = time.monotonic()
+        with self._lock:
+            hit = self._exact.get(key)
+            if (
+                hit
+                and now - hit[0] < self.ttl
+                and self._last_turn.get(key[:2]) in (hit[2], hit[3])
+            ):
+                self._exact.move_to_end(key)
+                return hit[1]
+        return None
+
+    def record(self, user_id: str, session_id: str, message: str, reply: str, cache: bool) -> None:
+        """Note a completed turn for the session, caching the reply if ``cache``."""
+        normalized = self._normalize(message)
+        session = (user_id, session_id)
+        now = time.monotonic()
+        with self._lock:
+            before = self._last_turn.get(session)
+            after = hash((normalized, reply))
+            self._last_turn[session] = after
+            self._last_turn.move_to_end(session)
+            while len(self._last_turn) > self.max_entries:
+                self._last_turn.popitem(last=False)
+            if not cache:
+                return
+            key = session + (normalized,)
+            self._exact[key] = (now, reply, before, after)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+
+
+# Messages that may act on funds or transactions always go through the full pipeline
+_UNCACHEABLE_WORDS = frozenset((
+    "buy", "sell", "swap", "trade", "send", "transfer", "confirm", "cancel",
+    "approve", "leverage", "long", "short", "close", "withdraw", "deposit",
+    # Account state changes faster than the cache TTL
+    "balance", "balances", "position", "positions", "portfolio", "holdings",
+    "wallet", "pnl",
+))
+
+# Messages shorter than this, or containing a word that refers back to the
+# conversation, only make sense in context and are never cached
+_MIN_CACHEABLE_WORDS = 4
+_CONTEXT_WORDS = frozenset((
+    "it", "this", "that", "these", "those", "again", "more", "same", "yes", "no",
+    "ok", "okay", "above", "previous", "last",
+))
+
+
+# Canned fallback replies from process_message; never cached
+_FALLBACK_REPLY_PREFIXES = ("I'm sorry", "I apologize", "I'm still thinking", "I processed your request but")
+
+
+def _is_cacheable_message(message: str) -> bool:
+    """Return True if a reply to ``message`` may be served from the response cache."""
+    if not message or message.lstrip().startswith(("/", "!")):
+        return False
+    words = "".join(c if c.isalnum() else " " for c in message.lower()).split()
+    if len(words) < _MIN_CACHEABLE_WORDS:
+        return False
+    words = set(words)
+    return not (words & _UNCACHEABLE_WORDS or words & _CONTEXT_WORDS)
+
+
+def _is_throttled(result) -> bool:
+    """Return True if a service result reports an upstream rate limit (HTTP 429)."""
+    if not isinstance(result, dict):
+        return False
+    if result.get("status_code") == 429:
+        return True
+    error = str(result.get("error") or "").lower()
+    return "429" in error or "rate limit" in error or "rate_limited" in error
+
+
+def _oi_safe(name: str, **fields: str):
+    """Turn exceptions raised by an OI helper into an error payload.
+
+    Args:
+        name: Helper name used in the log message
+        **fields: Payload key -> helper parameter name, echoed back in the error
+
+    The traceback is only formatted when DEBUG logging is enabled.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            except Exception as e:
+                logger.error("Error in %s: %s", name, e)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Traceback: %s", traceback.format_exc())
+                payload = {"error": str(e)}
+                if fields:
+                    bound = signature.bind_partial(self, *args, **kwargs)
+                    for key, param in fields.items():
+                        payload[key] = bound.arguments.get(param)
+                payload["status"] = "error"
+                return payload
+        return wrapper
+    return decorator
+
+
 class GraceCore:
     """Core class for Grace - an AI assistant based on Open Interpreter
     with crypto trading capabilities."""
 
+    # Fixed attribute set; new instance attributes must be added here
+    __slots__ = (
+        "config", "_cfg", "data_dir", "_paths", "encryption_key", "test_mode",
+        "secure_data_manager", "user_profile_system", "memory_system",
+        "_memory_warmup", "conversation_manager", "gmgn_service", "trading_service_selector",
+        "mango_v3_extension", "solana_wallet_manager", "internal_wallet_manager",
+        "transaction_confirmation", "research_service", "leverage_trade_manager",
+        "social_media_service", "agent_manager", "interpreter", "interpreter_core",
+        "current_session_id", "disclosure_shown",
+        "enhanced_conversation_flow",
+        "_price_cache", "_price_cache_ttl", "_price_cache_lock",
+        "_balance_cache", "_balance_cache_ttl", "_balance_cache_lock",
+        "_admin_cache", "_admin_cache_ttl", "_admin_cache_lock",
+        "_learn_inflight", "_learn_lock",
+        "_oi_executor", "_direct_oi_dispatch", "_rate_buckets", "_oi_helpers",
+        "_bg_loop", "_bg_loop_thread", "_response_cache", "_interp_pool",
+        "_interp_inflight", "_interp_timeouts", "_interp_lock",
+        "_oi_buffer", "_oi_buffer_lock",
+    )
+
+    @property
+    def current_user_id(self) -> Optional[str]:
+        """User ID for the request running in the current thread or task."""
+        return _current_user_id_var.get()
+
+    @current_user_id.setter
+    def current_user_id(self, user_id: Optional[str]) -> None:
+        _current_user_id_var.set(user_id)
+
+    # Subdirectories of data_dir created once at startup by _ensure_data_layout
+    _SUBDIRS = ("users", "conversation_data", "chromadb")
+
     def __init__(
         self,
         config_path: Optional[str] = None,
@@ -57,26 +565,55 @@ class GraceCore:
 
         # Load configuration
         self.config = self._load_config(config_path)
+        self._cfg = _Cfg.from_config(self.config)
 
         # Set and create data directories
-        self.data_dir = data_dir or self.config.get("data_dir", os.path.join(os.getcwd(), "data"))
-        os.makedirs(self.data_dir, exist_ok=True)
-
-        # Create users directory
-        users_dir = os.path.join(self.data_dir, "users")
-        os.makedirs(users_dir, exist_ok=True)
-
-        # Create profiles.json if it doesn\'t exist
-        profiles_path = os.path.join(self.data_dir, "profiles.json")
-        if not os.path.exists(profiles_path):
-            with open(profiles_path, 'w') as f:
-                json.dump({}, f)
+        self.data_dir = data_dir or self._cfg.data_dir
+        self._paths = self._ensure_data_layout()
 
         # Set encryption key
-        self.encryption_key = encryption_key or self.config.get("encryption_key", os.environ.get('FERNET_KEY', 'dGhpc19pc19hX3Byb3Blcl8zMl9ieXRlX2Zlcm5ldF9rZXk='))
+        self.encryption_key = encryption_key or self._cfg.encryption_key
         # Test mode flag
         self.test_mode = test_mode
 
+        # Short-lived cache for OI check_token_price results: symbol -> (monotonic ts, result)
+        self._price_cache: Dict[str, tuple] = {}
+        self._price_cache_ttl = 30.0
+        self._price_cache_lock = threading.Lock()
+        # Per-user cache for OI check_wallet_balance results: user_id -> (monotonic ts, result)
+        self._balance_cache: Dict[str, tuple] = {}
+        self._balance_cache_ttl = 15.0
+        self._balance_cache_lock = threading.Lock()
+        # Per-user cache for admin checks on special commands: user_id -> (monotonic ts, bool)
+        self._admin_cache: Dict[str, tuple] = {}
+        self._admin_cache_ttl = 60.0
+        self._admin_cache_lock = threading.Lock()
+        # HIGH-priority !grace.learn tasks still running: deque of (monotonic ts, task_id)
+        self._learn_inflight = deque()
+        self._learn_lock = threading.Lock()
+        # Worker pool for the *_async OI helpers; threads are only spawned on first submit
+        self._oi_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="oi-helper")
+        # Runs interpreter.chat so process_message can enforce a timeout on it
+        self._interp_pool = ThreadPoolExecutor(max_workers=_INTERP_WORKERS, thread_name_prefix="oi")
+        self._interp_inflight = 0
+        self._interp_timeouts = 0
+        self._interp_lock = threading.Lock()
+        # Per-upstream limiters for OI helpers that call external APIs
+        self._rate_buckets = {
+            "gmgn_price": _TokenBucket(rate=10, burst=20),
+            "research_pulse": _TokenBucket(rate=5, burst=10),
+            "chain_status": _TokenBucket(rate=8, burst=16),
+        }
+        # Bound OI helpers, created once so every interpreter (re)registration reuses them
+        self._oi_helpers = self._build_oi_helpers()
+        # One long-lived event loop for the async conversation paths; sync callers
+        # submit coroutines to it via _run_async instead of building a loop per message
+        self._bg_loop = asyncio.new_event_loop()
+        self._bg_loop_thread = threading.Thread(
+            target=self._bg_loop.run_forever, name="grace-async-loop", daemon=True
+        )
+        self._bg_loop_thread.start()
+
         # Initialize components (order matters for dependencies)
         self.secure_data_manager = self._init_secure_data_manager()
         self.user_profile_system = self._init_user_profile_system()
@@ -90,6 +627,12 @@ class GraceCore:
         self.leverage_trade_manager = self._init_leverage_trade_manager() # Initialize Leverage Trade Manager
         self.social_media_service = self._init_social_media_service() # Initialize Social Media Service
         self.agent_manager = self._init_agent_manager() # Initialize Agent Manager
+        self._direct_oi_dispatch = self._build_direct_oi_dispatch()
+        # Replies to recently repeated messages
+        self._response_cache = _ResponseCache()
+        # Validated Open Interpreter messages per user, appended to as turns happen
+        self._oi_buffer: "OrderedDict[str, deque]" = OrderedDict()
+        self._oi_buffer_lock = threading.Lock()
 
         # Initialize Open Interpreter components if not in test mode
         self.interpreter = None
@@ -114,7 +657,7 @@ class GraceCore:
         # Set up memory pruning
         self._setup_memory_pruning()
 
-        # Current user context (Consider managing this per request instead of globally)
+        # Current user context; current_user_id is per thread/task (see _current_user_id_var)
         self.current_user_id = None
         self.current_session_id = None
 
@@ -132,11 +675,34 @@ class GraceCore:
 
         logger.info("Grace Core initialized successfully")
 
+    def _ensure_data_layout(self) -> Dict[str, str]:
+        """Create the data directory tree and profiles.json once, returning their paths."""
+        root = Path(self.data_dir)
+        root.mkdir(parents=True, exist_ok=True)
+        paths = {"root": str(root)}
+        for sub in self._SUBDIRS:
+            sub_path = root / sub
+            sub_path.mkdir(exist_ok=True)
+            paths[sub] = str(sub_path)
+
+        # Create profiles.json if it doesn't exist
+        profiles_path = root / "profiles.json"
+        if not profiles_path.exists():
+            profiles_path.write_bytes(b"{}")
+        paths["profiles"] = str(profiles_path)
+        return paths
+
+    def _invalidate_balance_cache(self, user_id: Optional[str]):
+        """Drop a user's cached wallet balance after a trade or transaction change."""
+        if user_id:
+            with self._balance_cache_lock:
+                self._balance_cache.pop(str(user_id), None)
+
     def _load_config(self, config_path: Optional[str]) -> Dict[str, Any]:
         """Load configuration from file."""
         default_config = {
             "data_dir": os.path.join(os.getcwd(), "data"),
-            "encryption_key": os.environ.get('FERNET_KEY', 'dGhpc19pc19hX3Byb3Blcl8zMl9ieXRlX2Zlcm5ldF9rZXk='),
+            "encryption_key": os.environ.get('FERNET_KEY', DEFAULT_ENCRYPTION_KEY),
             "solana_rpc_url": "https://mainnet.helius-rpc.com/?api-key=aa07df83-e1ac-4117-b00d-173e94e4fff7",
             "solana_network": "mainnet-beta",
             "gmgn_router_endpoint": "https://gmgn.ai/defi/router/v1/sol/tx/get_swap_route",
@@ -153,11 +719,11 @@ class GraceCore:
             return default_config
 
         try:
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-                logger.info(f"Loaded configuration from {config_path}")
-                merged_config = {**default_config, **config}
-                return merged_config
+            with open(config_path, 'rb') as f:
+                config = _json_loads(f.read())
+            logger.info(f"Loaded configuration from {config_path}")
+            merged_config = {**default_config, **config}
+            return merged_config
         except Exception as e:
             logger.error(f"Error loading configuration from {config_path}: {str(e)}")
             logger.info("Using default configuration")
@@ -166,134 +732,45 @@ class GraceCore:
     def _init_secure_data_manager(self):
         """Initialize the secure data manager."""
         logger.info("Initializing Secure Data Manager")
-        profiles_path = os.path.join(self.data_dir, "profiles.json")
-        phantom_app_url = self.config.get("phantom_app_url", "https://phantom.app")
-        phantom_callback_path = self.config.get("phantom_callback_path", "/phantom/callback")
-        jwt_secret = self.config.get("jwt_secret", "grace_default_jwt_secret")
+        cfg = self._cfg
         return SecureDataManager(
-            profiles_path=profiles_path,
+            profiles_path=self._paths["profiles"],
             fernet_key=self.encryption_key,
-            jwt_secret=jwt_secret,
-            phantom_app_url=phantom_app_url,
-            phantom_callback_path=phantom_callback_path
+            jwt_secret=cfg.jwt_secret,
+            phantom_app_url=cfg.phantom_app_url,
+            phantom_callback_path=cfg.phantom_callback_path
         )
 
     def _init_user_profile_system(self):
         """Initialize the user profile system."""
         logger.info("Initializing User Profile System")
-        user_data_dir = os.path.join(self.data_dir, "users")
-        os.makedirs(user_data_dir, exist_ok=True)
-        profiles_path = os.path.join(self.data_dir, "profiles.json")
-        if not os.path.exists(profiles_path):
-            with open(profiles_path, 'w') as f:
-                json.dump({}, f)
         return UserProfileSystem(
-            data_dir=user_data_dir,
+            data_dir=self._paths["users"],
             secure_data_manager=self.secure_data_manager,
-            profiles_path=profiles_path
+            profiles_path=self._paths["profiles"]
         )
 
     def _init_memory_system(self):
         """Initialize the memory system."""
         logger.info("Initializing Memory System")
-        chroma_dir = os.environ.get('GRACE_CHROMA_DIR', os.path.join(self.data_dir, "chromadb"))
-        os.makedirs(chroma_dir, exist_ok=True)
-        return MemorySystem(
+        chroma_dir = os.environ.get('GRACE_CHROMA_DIR')
+        if chroma_dir:
+            os.makedirs(chroma_dir, exist_ok=True)
+        else:
+            chroma_dir = self._paths["chromadb"]
+        memory_system = MemorySystem(
             chroma_db_path=chroma_dir,
-            user_profile_system=self.user_profile_system
+            user_profile_system=self.user_profile_system,
+            warm=False
         )
+        # Load the ChromaDB store in the background while the remaining components
+        # initialize; the first access to a collection waits for it to finish.
+        self._memory_warmup = threading.Thread(
+            target=memory_system.warm, name="memory-warmup", daemon=True
+        )
+        self._memory_warmup.start()
+        return memory_system
         
-    def _init_conversation_manager(self):
-        """Initialize the conversation management system with robust state persistence."""
-        logger.info("Initializing Conversation Management System with enhanced state persistence")
-        conversation_dir = os.path.join(self.data_dir, "conversations")
-        os.makedirs(conversation_dir, exist_ok=True)
-        
-        # Create a state lock file to prevent race conditions
-        lock_file = os.path.join(conversation_dir, "state.lock")
-        
-        # Ensure we're not initializing during an existing operation
-        if os.path.exists(lock_file):
-            try:
-                # Check if lock is stale (more than 5 minutes old)
-                lock_time = os.path.getmtime(lock_file)
-                if time.time() - lock_time > 300:  # 5 minutes
-                    logger.warning("Found stale lock file, removing it")
-                    os.remove(lock_file)
-                else:
-                    logger.warning("Conversation system is currently being modified by another process")
-            except Exception as e:
-                logger.error(f"Error checking lock file: {e}")
-        
-        # Create the lock file to indicate we're initializing
-        try:
-            with open(lock_file, 'w') as f:
-                f.write(str(time.time()))
-        except Exception as e:
-            logger.error(f"Error creating lock file: {e}")
-        
-        try:
-            # Create conversation manager asynchronously with proper error handling
-            loop = asyncio.new_event_loop()  # Always create a new loop to avoid conflicts
-            asyncio.set_event_loop(loop)
-            
-            try:
-                # Use a timeout to prevent hanging
-                conversation_manager = loop.run_until_complete(
-                    asyncio.wait_for(
-                        create_conversation_management_system(conversation_dir),
-                        timeout=30  # 30 second timeout for initialization
-                    )
-                )
-                logger.info("Conversation management system initialized successfully")
-            except asyncio.TimeoutError:
-                logger.error("Conversation manager initialization timed out")
-                raise RuntimeError("Conversation manager initialization timed out")
-            finally:
-                loop.close()
-                
-            # Validate the conversation manager was properly initialized
-            if not hasattr(conversation_manager, 'get_or_create_context'):
-                logger.error("Conversation manager was not properly initialized")
-                raise ValueError("Invalid conversation manager instance")
-                
-            # Verify storage is working by writing and reading a test value
-            test_ctx_id = str(uuid.uuid4())
-            test_context = conversation_manager.create_context("test_user", test_ctx_id)
-            
-            # Save the test context
-            if hasattr(conversation_manager, 'save_context') and callable(conversation_manager.save_context):
-                if asyncio.iscoroutinefunction(conversation_manager.save_context):
-                    # Handle async save_context
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        loop.run_until_complete(conversation_manager.save_context(test_context))
-                    finally:
-                        loop.close()
-                else:
-                    # Handle sync save_context
-                    conversation_manager.save_context(test_context)
-                    
-                logger.info("Verified conversation persistence is working correctly")
-            else:
-                logger.warning("Conversation manager doesn't have expected save_context method")
-                
-            return conversation_manager
-            
-        except Exception as e:
-            logger.error(f"Error initializing conversation manager: {str(e)}")
-            # Create a basic fallback conversation manager if initialization fails
-            from src.conversation_management_wrapper import ConversationManager
-            return ConversationManager(conversation_dir)
-        finally:
-            # Always remove the lock file when done
-            try:
-                if os.path.exists(lock_file):
-                    os.remove(lock_file)
-            except Exception as e:
-                logger.error(f"Error removing lock file: {e}")
-
     def _init_gmgn_service(self):
         """Initialize the GMGN service with Mango V3 as primary trading service."""
         logger.info("Initializing GMGN Service with Mango V3 integration")
@@ -302,24 +779,22 @@ class GraceCore:
         from src.mango_spot_market import MangoSpotMarket
         from src.trading_service_selector import TradingServiceSelector
         
-        # Ensure we have a valid mango_url, using a default if not present in config
-        mango_url = self.config.get("mango_v3_endpoint")
-        if not mango_url:
-            mango_url = "http://localhost:8080"  # Default fallback URL on port 8080
-            logger.info(f"No Mango V3 endpoint configured, using default: {mango_url}")
+        cfg = self._cfg
+        if not self.config.get("mango_v3_endpoint"):
+            logger.info(f"No Mango V3 endpoint configured, using default: {cfg.mango_url}")
         
         mango_config = {
-            "mango_url": mango_url,  # Guaranteed to have a value now
-            "private_key_path": self.config.get("mango_private_key_path")
+            "mango_url": cfg.mango_url,  # Falls back to http://localhost:8080 in _Cfg
+            "private_key_path": cfg.mango_private_key_path
         }
         
         # Initialize GMGN with standard config
         gmgn_config = {
-            "trade_endpoint": self.config.get("gmgn_router_endpoint"),
+            "trade_endpoint": cfg.gmgn_router_endpoint,
             # Charts must stay with GMGN for consistent display and data format
-            "price_chart_endpoint": self.config.get("gmgn_price_endpoint"),  # GMGN-only chart endpoint
-            "solana_rpc_url": self.config.get("solana_rpc_url"),
-            "solana_network": self.config.get("solana_network")
+            "price_chart_endpoint": cfg.gmgn_price_endpoint,  # GMGN-only chart endpoint
+            "solana_rpc_url": cfg.solana_rpc_url,
+            "solana_network": cfg.solana_network
         }
         
         # Initialize the trading service selector (sets up both services)
@@ -365,7 +840,7 @@ class GraceCore:
             
             # Add the data_dir as an attribute after initialization
             internal_wallet_manager.data_dir = self.data_dir
-            internal_wallet_manager.solana_rpc_url = self.config.get("solana_rpc_url", "https://api.mainnet-beta.solana.com")
+            internal_wallet_manager.solana_rpc_url = self._cfg.solana_rpc_url or "https://api.mainnet-beta.solana.com"
             
             logger.info("Internal Wallet Manager successfully initialized")
             return internal_wallet_manager
@@ -396,11 +871,11 @@ class GraceCore:
                 solana_wallet_manager=self.solana_wallet_manager,
                 user_profile_system=self.user_profile_system,
                 gmgn_service=self.gmgn_service,
-                config=self.config.get("transaction_confirmation", {})
+                config=self._cfg.transaction_confirmation
             )
-        except Exception as e:
+        except (ImportError, ConnectionError, ValueError) as e:
             logger.error(f"Failed to initialize Transaction Confirmation System: {str(e)}")
-            return None
+            return _NullService("Transaction Confirmation System", str(e))
             
     def _init_research_service(self):
         """Initialize the Research Service."""
@@ -412,9 +887,9 @@ class GraceCore:
                 interpreter=None  # Will be set later if OpenInterpreter is available
             )
             return research_service
-        except Exception as e:
+        except (ImportError, ValueError) as e:
             logger.error(f"Failed to initialize Research Service: {str(e)}")
-            return None
+            return _NullService("Research Service", str(e))
 
     def _init_leverage_trade_manager(self):
         """Initialize the Leverage Trade Manager."""
@@ -428,16 +903,17 @@ class GraceCore:
                 gmgn_service=gmgn_service,
                 memory_system=getattr(self, 'memory_system', None),
                 logger=logger,
-                **self.config.get("leverage_trading", {})
+                **self._cfg.leverage_trading
             )
             
             return manager
-        except Exception as e:
+        except (ImportError, ConnectionError, ValueError, TypeError) as e:
+            # TypeError covers unknown keys in the "leverage_trading" config section
             logger.error(
                 f"Failed to initialize Leverage Trade Manager: {str(e)}",
                 exc_info=True
             )
-            return None
+            return _NullService("Leverage Trade Manager", str(e))
         
     def _init_social_media_service(self):
         """Initialize the Social Media Service."""
@@ -445,12 +921,12 @@ class GraceCore:
         try:
             return SocialMediaService(
                 memory_system=self.memory_system,
-                cache_duration=int(self.config.get("social_media_cache_duration", 3600)),
-                config=self.config.get("social_media", {})
+                cache_duration=self._cfg.social_media_cache_duration,
+                config=self._cfg.social_media
             )
-        except Exception as e:
+        except (ImportError, ConnectionError, ValueError) as e:
             logger.error(f"Failed to initialize Social Media Service: {str(e)}")
-            return None
+            return _NullService("Social Media Service", str(e))
             
     def _setup_memory_pruning(self):
         """Set up periodic memory pruning."""
@@ -462,7 +938,7 @@ class GraceCore:
             return
             
         # Define pruning interval (in seconds)
-        pruning_interval = self.config.get("memory_pruning_interval", 3600)  # Default: 1 hour
+        pruning_interval = self._cfg.memory_pruning_interval  # Default: 1 hour
         
         def pruning_task():
             """Task to periodically prune expired memories."""
@@ -485,9 +961,9 @@ class GraceCore:
     def _get_grace_system_message(self):
         """Get the Grace system message from system_prompts.py."""
         # Get a comprehensive system message that includes all prompt components
-        base_prompt = get_system_prompt("general")
-        trading_prompt = get_system_prompt("trading")
-        research_prompt = get_system_prompt("research")
+        base_prompt = _prompt("general")
+        trading_prompt = _prompt("trading")
+        research_prompt = _prompt("research")
         
         # Combine all prompts into a comprehensive system message
         # We need to extract just the trading and research specific parts
@@ -511,11 +987,8 @@ class GraceCore:
             wallet_connection_system=self.solana_wallet_manager
         )
             
-        # Import the conversation manager for process_message tasks
-        from src.conversation_management_wrapper import ConversationManager
-        conversation_storage_dir = os.path.join(self.data_dir, "conversations")
-        os.makedirs(conversation_storage_dir, exist_ok=True)
-        conversation_manager = ConversationManager(storage_dir=conversation_storage_dir)
+        # Reuse the conversation manager created in _init_conversation_manager for process_message tasks
+        conversation_manager = self.conversation_manager
         # Link conversation manager to agent manager so it can emit tasks
         if hasattr(conversation_manager, "set_agent_manager"):
             try:
@@ -555,20 +1028,27 @@ class GraceCore:
         agent_manager.register_agent_for_task_type("get_leverage_positions", leverage_trade_agent, AgentPriority.MEDIUM)
         agent_manager.register_agent_for_task_type("update_leverage_trade", leverage_trade_agent, AgentPriority.HIGH)
             
-        # Schedule smart trading monitoring task to run every 5 minutes
-        agent_manager.schedule_task(
-            task_type="monitor_smart_trading",
-            content={},  # No specific parameters needed
-            interval_seconds=300,  # 5 minutes
-            priority=AgentPriority.LOW
+        # Schedule smart trading monitoring task to run every 5 minutes. Registration is
+        # deferred so the first scheduler tick doesn't compete with startup.
+        schedule_timer = threading.Timer(
+            5.0,
+            agent_manager.schedule_task,
+            kwargs={
+                "task_type": "monitor_smart_trading",
+                "content": {},  # No specific parameters needed
+                "interval_seconds": 300,  # 5 minutes
+                "priority": AgentPriority.LOW
+            }
         )
-        logger.info("Scheduled smart trading monitoring task to run every 5 minutes")
+        schedule_timer.daemon = True
+        schedule_timer.start()
+        logger.info("Smart trading monitoring task will be scheduled to run every 5 minutes")
             
         # Community tracking operations
         agent_manager.register_agent_for_task_type("get_community_pulse", self.research_service, AgentPriority.MEDIUM)
             
-        # Start all agents
-        agent_manager.start_all_agents()
+        # Agents start on first dispatch rather than all at once here
+        agent_manager.prepare_agents()
             
         # Log registered task types for debugging
         logger.info(f"Registered task types: {list(agent_manager.task_type_to_agent.keys())}")
@@ -600,11 +1080,8 @@ class GraceCore:
             wallet_connection_system=self.solana_wallet_manager
         )
         
-        # Import the conversation manager for process_message tasks
-        from src.conversation_management_wrapper import ConversationManager
-        conversation_storage_dir = os.path.join(self.data_dir, "conversations")
-        os.makedirs(conversation_storage_dir, exist_ok=True)
-        conversation_manager = ConversationManager(storage_dir=conversation_storage_dir)
+        # Reuse the conversation manager created in _init_conversation_manager for process_message tasks
+        conversation_manager = self.conversation_manager
         
         # Link conversation manager to agent manager so it can emit tasks
         if hasattr(conversation_manager, "set_agent_manager"):
@@ -646,503 +1123,543 @@ class GraceCore:
         except Exception as e:
             logger.error(f"Failed to initialize/register LeverageTradeAgent: {e}")
         
-        # Schedule smart trading monitoring task to run every 5 minutes
-        agent_manager.schedule_task(
-            task_type="monitor_smart_trading",
-            content={},  # No specific parameters needed
-            interval_seconds=300,  # 5 minutes
-            priority=AgentPriority.LOW
+        # Schedule smart trading monitoring task to run every 5 minutes. Registration is
+        # deferred so the first scheduler tick doesn't compete with startup.
+        schedule_timer = threading.Timer(
+            5.0,
+            agent_manager.schedule_task,
+            kwargs={
+                "task_type": "monitor_smart_trading",
+                "content": {},  # No specific parameters needed
+                "interval_seconds": 300,  # 5 minutes
+                "priority": AgentPriority.LOW
+            }
         )
-        logger.info("Scheduled smart trading monitoring task to run every 5 minutes")
+        schedule_timer.daemon = True
+        schedule_timer.start()
+        logger.info("Smart trading monitoring task will be scheduled to run every 5 minutes")
         
         # Community tracking operations
         agent_manager.register_agent_for_task_type("get_community_pulse", self.research_service, AgentPriority.MEDIUM)
         
-        # Start all agents
-        agent_manager.start_all_agents()
+        # Agents start on first dispatch rather than all at once here
+        agent_manager.prepare_agents()
         
         # Log registered task types for debugging
         logger.info(f"Registered task types: {list(agent_manager.task_type_to_agent.keys())}")
         
         return agent_manager
         
-    def _register_interpreter_functions(self, interpreter_instance):
-        """Register helper functions with Open Interpreter to allow direct calls to the agent framework."""
-        logger.info("Registering helper functions with Open Interpreter")
+    # Public Open Interpreter helper names; each is implemented by the _oi_<name> method
+    _OI_HELPER_NAMES = (
+        "check_token_price",
+        "check_token_prices",
+        "check_wallet_balance",
+        "prepare_trade",
+        "get_market_sentiment",
+        "confirm_transaction",
+        "cancel_transaction",
+        "get_pending_transactions",
+        "check_transaction_status",
+        "process_phantom_callback",
+        "check_token_price_async",
+        "check_wallet_balance_async",
+        "get_market_sentiment_async",
+    )
+
+    def _build_oi_helpers(self) -> MappingProxyType:
+        """Map each public OI helper name to its bound implementation."""
+        return MappingProxyType({name: getattr(self, f"_oi_{name}") for name in self._OI_HELPER_NAMES})
+
+    def _build_direct_oi_dispatch(self) -> Dict[str, Any]:
+        """Map OI task types that have exactly one owning service to that service's handler."""
+        return {
+            "price_check": self.gmgn_service.process_task,
+            "price_check_batch": self.gmgn_service.process_task,
+            "check_wallet_balance": self.gmgn_service.process_task,
+            "get_community_pulse": self.research_service.process_task,
+        }
+
+    def _dispatch_oi_task(self, task_type: str, content: Dict[str, Any]):
+        """Run an OI helper task, calling the owning service directly when one is registered.
+
+        Task types without a direct handler fall back to the agent framework.
+        """
+        handler = self._direct_oi_dispatch.get(task_type)
+        if handler is not None:
+            return handler({"type": task_type, **content})
+
+        task = AgentTask(
+            task_id=f"oi_{uuid.uuid4().hex[:8]}",
+            task_type=task_type,
+            content=content,
+            queue_level=0,
+        )
+        return self.agent_manager.process_task_sync(task)
+
+    def _acquire_rate_token(self, bucket_name: str, tokens: int = 1) -> Optional[Dict[str, Any]]:
+        """Take tokens for an upstream API; returns an error payload when rate limited."""
+        bucket = self._rate_buckets[bucket_name]
+        if bucket.try_acquire(tokens):
+            return None
+        logger.warning("OI call to %s rate limited locally", bucket_name)
+        return {"error": "rate_limited", "retry_after": bucket.retry_after(tokens), "status": "error"}
+
+    def _record_rate_outcome(self, bucket_name: str, result) -> None:
+        """Adjust an upstream's bucket rate from the service result (AIMD)."""
+        bucket = self._rate_buckets[bucket_name]
+        if _is_throttled(result):
+            bucket.backoff()
+            logger.warning("%s throttled upstream; rate lowered to %.2f/s", bucket_name, bucket.rate)
+        else:
+            bucket.recover()
+
+    def _finalize_oi_result(self, result, task_name: str, label: str, **fields) -> Dict[str, Any]:
+        """Validate an agent/service result for an OI helper and fill in default fields.
+
+        Args:
+            result: Raw result returned by the agent framework or service
+            task_name: Task name used in log messages
+            label: Human readable operation name used in the invalid-result error
+            **fields: Identifying fields (symbol, user_id, ...) added to error payloads and,
+                when not None, to successful results that lack them
+
+        Returns:
+            dict: The result with status/fields set, or an error payload
+        """
+        if not result or not isinstance(result, dict):
+            logger.warning("Invalid result from %s task: %s", task_name, result)
+            return {"error": f"Invalid result from {label}", **fields, "status": "error"}
+
+        if "error" in result:
+            logger.warning("Error in %s result: %s", task_name, result['error'])
+            return {"error": result["error"], **fields, "status": "error"}
+
+        # Add status and identifying fields if not present
+        result.setdefault("status", "success")
+        for key, value in fields.items():
+            if value is not None:
+                result.setdefault(key, value)
+        return result
+
+    # Thin transaction-system passthroughs:
+    # method -> (required params, error when one is missing, invalidates cached balance)
+    _TX_PASSTHROUGH = {
+        "confirm_transaction": (("confirmation_id",), _ERR_NO_CONFIRMATION, True),
+        "cancel_transaction": (("confirmation_id",), _ERR_NO_CONFIRMATION, True),
+        "process_phantom_callback": (("transaction_id", "signature"), _ERR_NO_CALLBACK_ARGS, False),
+        "get_pending_transactions": ((), None, False),
+    }
+
+    def _forward_to_transaction_system(self, method: str, **kwargs) -> Dict[str, Any]:
+        """Validate arguments for a passthrough OI helper and call the transaction system.
+
+        A ``user_id`` keyword, when passed, defaults to the current user and is required.
+        """
+        required, missing_error, invalidates_balance = self._TX_PASSTHROUGH[method]
+        for param in required:
+            if not kwargs[param]:
+                return dict(missing_error)
+
+        if "user_id" in kwargs:
+            user_id = kwargs["user_id"] or self.current_user_id
+            if not user_id:
+                return dict(_ERR_NO_USER)
+            kwargs["user_id"] = user_id
+            if invalidates_balance:
+                self._invalidate_balance_cache(user_id)
+
+        return getattr(self.transaction_confirmation, method)(**kwargs)
+
+    # 1. Function to check token prices
+    @_oi_safe("check_token_price", symbol="token_symbol")
+    def _oi_check_token_price(self, token_symbol):
+        """Get the current price of a cryptocurrency token.
         
-        try:
-            # Check if the interpreter supports function registration
-            if not hasattr(interpreter_instance, 'function') and not hasattr(interpreter_instance, 'register_function'):
-                logger.warning("Open Interpreter does not support function registration")
-                return
-            
-            # Define helper functions that will be registered with Open Interpreter
+        Args:
+            token_symbol (str): The symbol of the token to check (e.g., BTC, ETH, SOL)
             
-            # 1. Function to check token prices
-            def check_token_price(token_symbol):
-                """Get the current price of a cryptocurrency token.
-                
-                Args:
-                    token_symbol (str): The symbol of the token to check (e.g., BTC, ETH, SOL)
-                    
-                Returns:
-                    dict: Price information including current price and 24h change
-                """
-                logger.info(f"OI function called: check_token_price({token_symbol})")
-                try:
-                    # Validate input
-                    if not token_symbol:
-                        return {"error": "Token symbol is required", "status": "error"}
-                    
-                    # Normalize token symbol
-                    if isinstance(token_symbol, str):
-                        token_symbol = token_symbol.upper().strip()
-                    else:
-                        token_symbol = str(token_symbol).upper().strip()
-                    
-                    # Create and route a price_check task through the agent framework
-                    task = self.agent_manager.create_task(
-                        task_type="price_check",
-                        content={"token_symbol": token_symbol, "user_id": "system"}
-                    )
-                    
-                    # Process the task synchronously
-                    result = self.agent_manager.process_task_sync(task)
-                    
-                    # Validate result
-                    if not result or not isinstance(result, dict):
-                        logger.warning(f"Invalid result from price_check task: {result}")
-                        return {"error": "Invalid result from price check", "symbol": token_symbol, "status": "error"}
-                    
-                    # Check for errors in the result
-                    if "error" in result:
-                        logger.warning(f"Error in price_check result: {result['error']}")
-                        return {"error": result["error"], "symbol": token_symbol, "status": "error"}
-                    
-                    # Add status if not present
-                    if "status" not in result:
-                        result["status"] = "success"
-                    
-                    # Add symbol if not present
-                    if "symbol" not in result:
-                        result["symbol"] = token_symbol
-                    
-                    return result
-                except Exception as e:
-                    logger.error(f"Error in check_token_price: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    return {"error": str(e), "symbol": token_symbol, "status": "error"}
+        Returns:
+            dict: Price information including current price and 24h change
+        """
+        logger.info("OI function called: check_token_price(%s)", token_symbol)
+        # Validate input
+        if not token_symbol:
+            return dict(_ERR_NO_SYMBOL)
+        
+        # Normalize token symbol
+        token_symbol = _normalize_symbol(token_symbol)
+        
+        # Serve repeated lookups for the same symbol from the TTL cache
+        now = time.monotonic()
+        with self._price_cache_lock:
+            hit = self._price_cache.get(token_symbol)
+        if hit and now - hit[0] < self._price_cache_ttl:
+            return dict(hit[1])
+        
+        limited = self._acquire_rate_token("gmgn_price")
+        if limited:
+            limited["symbol"] = token_symbol
+            return limited
+        
+        # Route the price_check task straight to the price service
+        result = self._dispatch_oi_task(
+            "price_check", {"token_symbol": token_symbol, "user_id": "system"}
+        )
+        self._record_rate_outcome("gmgn_price", result)
+        result = self._finalize_oi_result(result, "price_check", "price check", symbol=token_symbol)
+        
+        if result["status"] != "error":
+            with self._price_cache_lock:
+                self._price_cache[token_symbol] = (now, dict(result))
+        
+        return result
+    
+    # 2. Function to check wallet balance
+    @_oi_safe("check_wallet_balance", user_id="user_id")
+    def _oi_check_wallet_balance(self, user_id=None):
+        """Get the current wallet balance for a user.
+        
+        Args:
+            user_id (str, optional): The user ID to check balance for. Defaults to current user.
             
-            # 2. Function to check wallet balance
-            def check_wallet_balance(user_id=None):
-                """Get the current wallet balance for a user.
-                
-                Args:
-                    user_id (str, optional): The user ID to check balance for. Defaults to current user.
-                    
-                Returns:
-                    dict: Wallet balance information
-                """
-                logger.info(f"OI function called: check_wallet_balance({user_id})")
-                try:
-                    # Use the current user ID if none is provided
-                    if not user_id:
-                        user_id = self.current_user_id or "system"
-                        logger.info(f"Using current user ID: {user_id}")
-                    
-                    # Validate user_id
-                    if not isinstance(user_id, str):
-                        user_id = str(user_id)
-                    
-                    # Create and route a check_wallet_balance task through the agent framework
-                    task = self.agent_manager.create_task(
-                        task_type="check_wallet_balance",
-                        content={"user_id": user_id}
-                    )
-                    
-                    # Process the task synchronously
-                    result = self.agent_manager.process_task_sync(task)
-                    
-                    # Validate result
-                    if not result or not isinstance(result, dict):
-                        logger.warning(f"Invalid result from check_wallet_balance task: {result}")
-                        return {"error": "Invalid result from wallet balance check", "user_id": user_id, "status": "error"}
-                    
-                    # Check for errors in the result
-                    if "error" in result:
-                        logger.warning(f"Error in check_wallet_balance result: {result['error']}")
-                        return {"error": result["error"], "user_id": user_id, "status": "error"}
-                    
-                    # Add status if not present
-                    if "status" not in result:
-                        result["status"] = "success"
-                    
-                    # Add user_id if not present
-                    if "user_id" not in result:
-                        result["user_id"] = user_id
-                    
-                    return result
-                except Exception as e:
-                    logger.error(f"Error in check_wallet_balance: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    return {"error": str(e), "user_id": user_id, "status": "error"}
+        Returns:
+            dict: Wallet balance information
+        """
+        logger.info("OI function called: check_wallet_balance(%s)", user_id)
+        # Use the current user ID if none is provided
+        if not user_id:
+            user_id = self.current_user_id or "system"
+            logger.info("Using current user ID: %s", user_id)
+        
+        # Validate user_id
+        if not isinstance(user_id, str):
+            user_id = str(user_id)
+        
+        # Serve repeated balance checks for the same user from the TTL cache
+        now = time.monotonic()
+        with self._balance_cache_lock:
+            hit = self._balance_cache.get(user_id)
+        if hit and now - hit[0] < self._balance_cache_ttl:
+            return dict(hit[1])
+        
+        # Route the check_wallet_balance task straight to the wallet service
+        result = self._dispatch_oi_task("check_wallet_balance", {"user_id": user_id})
+        result = self._finalize_oi_result(
+            result, "check_wallet_balance", "wallet balance check", user_id=user_id
+        )
+        
+        if result["status"] != "error":
+            with self._balance_cache_lock:
+                self._balance_cache[user_id] = (now, dict(result))
+        
+        return result
+    
+    # 3. Function to prepare a trade
+    @_oi_safe("prepare_trade", from_token="from_token", to_token="to_token")
+    def _oi_prepare_trade(self, from_token, to_token, amount=None):
+        """Prepare a trade between two tokens.
+        
+        Args:
+            from_token (str): The token to trade from
+            to_token (str): The token to trade to
+            amount (float, optional): The amount to trade. If None, will just show exchange rate.
             
-            # 3. Function to prepare a trade
-            def prepare_trade(from_token, to_token, amount=None):
-                """Prepare a trade between two tokens.
-                
-                Args:
-                    from_token (str): The token to trade from
-                    to_token (str): The token to trade to
-                    amount (float, optional): The amount to trade. If None, will just show exchange rate.
-                    
-                Returns:
-                    dict: Trade preparation information including exchange rate and estimated result
-                """
-                logger.info(f"OI function called: prepare_trade({from_token}, {to_token}, {amount})")
-                try:
-                    # Validate inputs
-                    if not from_token or not to_token:
-                        missing = []
-                        if not from_token: missing.append("from_token")
-                        if not to_token: missing.append("to_token")
-                        return {"error": f"Missing required parameters: {', '.join(missing)}", "status": "error"}
-                    
-                    # Normalize token symbols
-                    if isinstance(from_token, str):
-                        from_token = from_token.upper().strip()
-                    else:
-                        from_token = str(from_token).upper().strip()
-                        
-                    if isinstance(to_token, str):
-                        to_token = to_token.upper().strip()
-                    else:
-                        to_token = str(to_token).upper().strip()
-                    
-                    # Convert amount to float if provided
-                    if amount is not None:
-                        try:
-                            amount = float(amount)
-                        except (ValueError, TypeError):
-                            logger.warning(f"Invalid amount format: {amount}, using None instead")
-                            amount = None
-                    
-                    # Use the transaction confirmation system to prepare the trade
-                    user_id = self.current_user_id or "system"
-                    
-                    # Prepare transaction parameters
-                    parameters = {
-                        "from_token": from_token,
-                        "to_token": to_token
-                    }
-                    
-                    # Add amount if provided
-                    if amount is not None:
-                        parameters["amount"] = amount
-                    
-                    # Use transaction confirmation system to prepare the transaction
-                    result = self.transaction_confirmation.prepare_transaction(
-                        user_id=user_id,
-                        transaction_type="swap",
-                        parameters=parameters,
-                        wallet_type="internal"  # Default to internal wallet
-                    )
-                    
-                    # Validate result
-                    if not result or not isinstance(result, dict):
-                        logger.warning(f"Invalid result from trade_initiate task: {result}")
-                        return {"error": "Invalid result from trade preparation", 
-                                "from_token": from_token, "to_token": to_token, "status": "error"}
-                    
-                    # Check for errors in the result
-                    if "error" in result:
-                        logger.warning(f"Error in trade_initiate result: {result['error']}")
-                        return {"error": result["error"], "from_token": from_token, 
-                                "to_token": to_token, "status": "error"}
-                    
-                    # Add status if not present
-                    if "status" not in result:
-                        result["status"] = "success"
-                    
-                    # Add tokens if not present
-                    if "from_token" not in result:
-                        result["from_token"] = from_token
-                    if "to_token" not in result:
-                        result["to_token"] = to_token
-                    
-                    return result
-                except Exception as e:
-                    logger.error(f"Error in prepare_trade: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    return {"error": str(e), "from_token": from_token, "to_token": to_token, "status": "error"}
+        Returns:
+            dict: Trade preparation information including exchange rate and estimated result
+        """
+        logger.info("OI function called: prepare_trade(%s, %s, %s)", from_token, to_token, amount)
+        # Validate inputs
+        if not from_token or not to_token:
+            missing = []
+            if not from_token: missing.append("from_token")
+            if not to_token: missing.append("to_token")
+            return {"error": f"Missing required parameters: {', '.join(missing)}", "status": "error"}
+        
+        # Normalize token symbols
+        from_token = _normalize_symbol(from_token)
+        to_token = _normalize_symbol(to_token)
+        
+        # Convert amount to float if provided
+        if amount is not None:
+            try:
+                amount = float(amount)
+            except (ValueError, TypeError):
+                logger.warning("Invalid amount format: %s, using None instead", amount)
+                amount = None
+        
+        # Use the transaction confirmation system to prepare the trade
+        user_id = self.current_user_id or "system"
+        self._invalidate_balance_cache(user_id)
+        
+        # Prepare transaction parameters
+        parameters = {
+            "from_token": from_token,
+            "to_token": to_token
+        }
+        
+        # Add amount if provided
+        if amount is not None:
+            parameters["amount"] = amount
+        
+        # Use transaction confirmation system to prepare the transaction
+        result = self.transaction_confirmation.prepare_transaction(
+            user_id=user_id,
+            transaction_type="swap",
+            parameters=parameters,
+            wallet_type="internal"  # Default to internal wallet
+        )
+        
+        return self._finalize_oi_result(
+            result, "trade_initiate", "trade preparation", from_token=from_token, to_token=to_token
+        )
+    
+    # 4. Function to get market sentiment
+    @_oi_safe("get_market_sentiment", token="token")
+    def _oi_get_market_sentiment(self, token=None):
+        """Get the current market sentiment for a token or the overall market.
+        
+        Args:
+            token (str, optional): The token to check sentiment for. If None, checks overall market.
             
-            # 4. Function to get market sentiment
-            def get_market_sentiment(token=None):
-                """Get the current market sentiment for a token or the overall market.
-                
-                Args:
-                    token (str, optional): The token to check sentiment for. If None, checks overall market.
-                    
-                Returns:
-                    dict: Sentiment information
-                """
-                logger.info(f"OI function called: get_market_sentiment({token})")
-                try:
-                    # Normalize token if provided
-                    if token:
-                        if isinstance(token, str):
-                            token = token.upper().strip()
-                        else:
-                            token = str(token).upper().strip()
-                    
-                    # Create and route a get_community_pulse task through the agent framework
-                    task = self.agent_manager.create_task(
-                        task_type="get_community_pulse",
-                        content={
-                            "token": token, 
-                            "user_id": self.current_user_id or "system"
-                        }
-                    )
-                    
-                    # Process the task synchronously
-                    result = self.agent_manager.process_task_sync(task)
-                    
-                    # Validate result
-                    if not result or not isinstance(result, dict):
-                        logger.warning(f"Invalid result from get_community_pulse task: {result}")
-                        return {"error": "Invalid result from market sentiment check", 
-                                "token": token, "status": "error"}
-                    
-                    # Check for errors in the result
-                    if "error" in result:
-                        logger.warning(f"Error in get_community_pulse result: {result['error']}")
-                        return {"error": result["error"], "token": token, "status": "error"}
-                    
-                    # Add status if not present
-                    if "status" not in result:
-                        result["status"] = "success"
-                    
-                    # Add token if not present and was provided
-                    if token and "token" not in result:
-                        result["token"] = token
-                    
-                    return result
-                except Exception as e:
-                    logger.error(f"Error in get_market_sentiment: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    return {"error": str(e), "token": token, "status": "error"}
+        Returns:
+            dict: Sentiment information
+        """
+        logger.info("OI function called: get_market_sentiment(%s)", token)
+        # Normalize token if provided
+        if token:
+            token = _normalize_symbol(token)
+        
+        limited = self._acquire_rate_token("research_pulse")
+        if limited:
+            limited["token"] = token
+            return limited
+        
+        # Route the get_community_pulse task straight to the research service
+        result = self._dispatch_oi_task(
+            "get_community_pulse",
+            {"token": token, "user_id": self.current_user_id or "system"}
+        )
+        self._record_rate_outcome("research_pulse", result)
+        return self._finalize_oi_result(
+            result, "get_community_pulse", "market sentiment check", token=token
+        )
+    
+    # 5. Function to confirm a pending transaction
+    @_oi_safe("confirm_transaction", confirmation_id="confirmation_id")
+    def _oi_confirm_transaction(self, confirmation_id, user_id=None):
+        """Confirm a pending transaction.
+        
+        Args:
+            confirmation_id (str): The ID of the transaction to confirm
+            user_id (str, optional): The user ID. Defaults to current user.
             
-            # 5. Function to confirm a pending transaction
-            def confirm_transaction(confirmation_id, user_id=None):
-                """Confirm a pending transaction.
-                
-                Args:
-                    confirmation_id (str): The ID of the transaction to confirm
-                    user_id (str, optional): The user ID. Defaults to current user.
-                    
-                Returns:
-                    dict: Transaction confirmation result
-                """
-                logger.info(f"OI function called: confirm_transaction({confirmation_id}, {user_id})")
-                try:
-                    # Validate input
-                    if not confirmation_id:
-                        return {"error": "Confirmation ID is required", "status": "error"}
-                    
-                    # Use current user if not specified
-                    if not user_id:
-                        user_id = self.current_user_id
-                    
-                    if not user_id:
-                        return {"error": "User ID is required", "status": "error"}
-                    
-                    # Confirm the transaction
-                    return self.transaction_confirmation.confirm_transaction(
-                        user_id=user_id,
-                        confirmation_id=confirmation_id
-                    )
-                except Exception as e:
-                    logger.error(f"Error in confirm_transaction: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    return {"error": str(e), "confirmation_id": confirmation_id, "status": "error"}
+        Returns:
+            dict: Transaction confirmation result
+        """
+        logger.info("OI function called: confirm_transaction(%s, %s)", confirmation_id, user_id)
+        return self._forward_to_transaction_system(
+            "confirm_transaction", confirmation_id=confirmation_id, user_id=user_id
+        )
+
+    # 6. Function to cancel a pending transaction
+    @_oi_safe("cancel_transaction", confirmation_id="confirmation_id")
+    def _oi_cancel_transaction(self, confirmation_id, user_id=None):
+        """Cancel a pending transaction.
+        
+        Args:
+            confirmation_id (str): The ID of the transaction to cancel
+            user_id (str, optional): The user ID. Defaults to current user.
             
-            # 6. Function to cancel a pending transaction
-            def cancel_transaction(confirmation_id, user_id=None):
-                """Cancel a pending transaction.
-                
-                Args:
-                    confirmation_id (str): The ID of the transaction to cancel
-                    user_id (str, optional): The user ID. Defaults to current user.
-                    
-                Returns:
-                    dict: Transaction cancellation result
-                """
-                logger.info(f"OI function called: cancel_transaction({confirmation_id}, {user_id})")
-                try:
-                    # Validate input
-                    if not confirmation_id:
-                        return {"error": "Confirmation ID is required", "status": "error"}
-                    
-                    # Use current user if not specified
-                    if not user_id:
-                        user_id = self.current_user_id
-                    
-                    if not user_id:
-                        return {"error": "User ID is required", "status": "error"}
-                    
-                    # Cancel the transaction
-                    return self.transaction_confirmation.cancel_transaction(
-                        user_id=user_id,
-                        confirmation_id=confirmation_id
-                    )
-                except Exception as e:
-                    logger.error(f"Error in cancel_transaction: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    return {"error": str(e), "confirmation_id": confirmation_id, "status": "error"}
+        Returns:
+            dict: Transaction cancellation result
+        """
+        logger.info("OI function called: cancel_transaction(%s, %s)", confirmation_id, user_id)
+        return self._forward_to_transaction_system(
+            "cancel_transaction", confirmation_id=confirmation_id, user_id=user_id
+        )
+
+    # 7. Function to check transaction status
+    @_oi_safe("check_transaction_status", transaction_hash="transaction_hash")
+    def _oi_check_transaction_status(self, transaction_hash):
+        """Check the status of a transaction on the blockchain.
+        
+        Args:
+            transaction_hash (str): The transaction hash to check
             
-            # 7. Function to check transaction status
-            def check_transaction_status(transaction_hash):
-                """Check the status of a transaction on the blockchain.
-                
-                Args:
-                    transaction_hash (str): The transaction hash to check
-                    
-                Returns:
-                    dict: Transaction status information
-                """
-                logger.info(f"OI function called: check_transaction_status({transaction_hash})")
-                try:
-                    # Validate input
-                    if not transaction_hash:
-                        return {"error": "Transaction hash is required", "status": "error"}
-                    
-                    # Check transaction status
-                    return self.transaction_confirmation.check_transaction_status(
-                        transaction_hash=transaction_hash
-                    )
-                except Exception as e:
-                    logger.error(f"Error in check_transaction_status: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    return {"error": str(e), "transaction_hash": transaction_hash, "status": "error"}
+        Returns:
+            dict: Transaction status information
+        """
+        logger.info("OI function called: check_transaction_status(%s)", transaction_hash)
+        # Validate input
+        if not transaction_hash:
+            return dict(_ERR_NO_TX_HASH)
+        
+        limited = self._acquire_rate_token("chain_status")
+        if limited:
+            limited["transaction_hash"] = transaction_hash
+            return limited
+        
+        # Check transaction status
+        result = self.transaction_confirmation.check_transaction_status(
+            transaction_hash=transaction_hash
+        )
+        self._record_rate_outcome("chain_status", result)
+        return result
+    
+    # 8. Function to process Phantom wallet callback
+    @_oi_safe("process_phantom_callback", transaction_id="transaction_id")
+    def _oi_process_phantom_callback(self, transaction_id, signature):
+        """Process callback from Phantom wallet after transaction approval.
+        
+        Args:
+            transaction_id (str): The transaction ID
+            signature (str): The transaction signature
             
-            # 8. Function to process Phantom wallet callback
-            def process_phantom_callback(transaction_id, signature):
-                """Process callback from Phantom wallet after transaction approval.
-                
-                Args:
-                    transaction_id (str): The transaction ID
-                    signature (str): The transaction signature
-                    
-                Returns:
-                    dict: Transaction result
-                """
-                logger.info(f"OI function called: process_phantom_callback({transaction_id}, {signature})")
-                try:
-                    # Validate input
-                    if not transaction_id or not signature:
-                        return {"error": "Transaction ID and signature are required", "status": "error"}
-                    
-                    # Process callback
-                    return self.transaction_confirmation.process_phantom_callback(
-                        transaction_id=transaction_id,
-                        signature=signature
-                    )
-                except Exception as e:
-                    logger.error(f"Error in process_phantom_callback: {str(e)}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    return {"error": str(e), "transaction_id": transaction_id, "status": "error"}
+        Returns:
+            dict: Transaction result
+        """
+        logger.info("OI function called: process_phantom_callback(%s, %s)", transaction_id, signature)
+        return self._forward_to_transaction_system(
+            "process_phantom_callback", transaction_id=transaction_id, signature=signature
+        )
+
+    # 9. Function to get pending transactions
+    @_oi_safe("get_pending_transactions")
+    def _oi_get_pending_transactions(self, user_id=None):
+        """Get all pending transactions for a user.
+        
+        Args:
+            user_id (str, optional): The user ID. Defaults to current user.
             
-            # 7. Function to get pending transactions
-            def get_pending_transactions(user_id=None):
-                """Get all pending transactions for a user.
-                
-                Args:
-                    user_id (str, optional): The user ID. Defaults to current user.
-                    
-                Returns:
-                    dict: Pending transactions
-                """
-                logger.info(f"OI function called: get_pending_transactions({user_id})")
-                try:
-                    # Use current user if not specified
-                    if not user_id:
-                        user_id = self.current_user_id
-                    
-                    if not user_id:
-                        return {"error": "User ID is required", "status": "error"}
-                    
-                    # Get pending transactions
-                    return self.transaction_confirmation.get_pending_transactions(
-                        user_id=user_id
-                    )
-                except Exception as e:
-                    logger.error(f"Error in get_pending_transactions: {str(e)}")
-                    return {"error": str(e), "status": "error"}
+        Returns:
+            dict: Pending transactions
+        """
+        logger.info("OI function called: get_pending_transactions(%s)", user_id)
+        return self._forward_to_transaction_system("get_pending_transactions", user_id=user_id)
 
+    # 10. Function to check several token prices at once
+    @_oi_safe("check_token_prices", symbols="symbols")
+    def _oi_check_token_prices(self, symbols):
+        """Get the current prices of several cryptocurrency tokens in one call.
+        
+        Args:
+            symbols (list[str] | str): Token symbols, as a list or a comma-separated string
+            
+        Returns:
+            dict: {"prices": {symbol: price information}, "status": "success"}
+        """
+        logger.info("OI function called: check_token_prices(%s)", symbols)
+        if isinstance(symbols, str):
+            symbols = symbols.split(",")
+        
+        # Normalize and de-duplicate while keeping the caller's order
+        wanted = list(dict.fromkeys(filter(None, (_normalize_symbol(s) for s in symbols or () if s))))
+        if not wanted:
+            return dict(_ERR_NO_SYMBOLS)
+        
+        # Serve what we can from the TTL cache shared with check_token_price
+        now = time.monotonic()
+        prices = {}
+        misses = []
+        with self._price_cache_lock:
+            for symbol in wanted:
+                hit = self._price_cache.get(symbol)
+                if hit and now - hit[0] < self._price_cache_ttl:
+                    prices[symbol] = dict(hit[1])
+                else:
+                    misses.append(symbol)
+        
+        if misses:
+            limited = self._acquire_rate_token("gmgn_price", len(misses))
+            if limited:
+                limited["symbols"] = misses
+                return limited
+            
+            # Fetch every miss with a single batch task
+            result = self._dispatch_oi_task(
+                "price_check_batch", {"symbols": misses, "user_id": "system"}
+            )
+            self._record_rate_outcome("gmgn_price", result)
+            result = self._finalize_oi_result(
+                result, "price_check_batch", "batch price check", symbols=misses
+            )
+            if result["status"] == "error":
+                return result
+            
+            batch = result.get("prices") or {}
+            with self._price_cache_lock:
+                for symbol in misses:
+                    price = batch.get(symbol)
+                    if not isinstance(price, dict):
+                        prices[symbol] = {"error": "No price returned", "symbol": symbol, "status": "error"}
+                        continue
+                    price.setdefault("status", "success")
+                    price.setdefault("symbol", symbol)
+                    if price["status"] != "error":
+                        self._price_cache[symbol] = (now, dict(price))
+                    prices[symbol] = price
+        
+        return {"prices": {symbol: prices[symbol] for symbol in wanted}, "status": "success"}
+
+    # Future-returning variants so independent lookups can run concurrently,
+    # e.g. concurrent.futures.wait([check_token_price_async("SOL"), get_market_sentiment_async("SOL")])
+    def _oi_check_token_price_async(self, token_symbol):
+        """Start check_token_price in the background and return a Future for its result."""
+        return self._oi_executor.submit(
+            contextvars.copy_context().run, self._oi_check_token_price, token_symbol
+        )
+    
+    def _oi_check_wallet_balance_async(self, user_id=None):
+        """Start check_wallet_balance in the background and return a Future for its result."""
+        if not user_id:
+            # Resolve now; the worker thread does not share this context
+            user_id = self.current_user_id or "system"
+        return self._oi_executor.submit(self._oi_check_wallet_balance, user_id)
+    
+    def _oi_get_market_sentiment_async(self, token=None):
+        """Start get_market_sentiment in the background and return a Future for its result."""
+        return self._oi_executor.submit(
+            contextvars.copy_context().run, self._oi_get_market_sentiment, token
+        )
+
+    def _register_interpreter_functions(self, interpreter_instance):
+        """Register helper functions with Open Interpreter to allow direct calls to the agent framework."""
+        logger.info("Registering helper functions with Open Interpreter")
+        
+        try:
+            # Check if the interpreter supports function registration
+            if not hasattr(interpreter_instance, 'function') and not hasattr(interpreter_instance, 'register_function'):
+                logger.warning("Open Interpreter does not support function registration")
+                return
+            
             # Register all functions with the interpreter
             if hasattr(interpreter_instance, 'register_function'):
-                interpreter_instance.register_function(prepare_trade)
-                interpreter_instance.register_function(get_market_sentiment)
-                interpreter_instance.register_function(confirm_transaction)
-                interpreter_instance.register_function(cancel_transaction)
-                interpreter_instance.register_function(get_pending_transactions)
-                interpreter_instance.register_function(check_transaction_status)
-                interpreter_instance.register_function(process_phantom_callback)
+                for func in self._oi_helpers.values():
+                    interpreter_instance.register_function(func)
                 logger.info("Registered functions with Open Interpreter using register_function method")
             else:
                 # Try a more generic approach
                 logger.warning("Using generic approach to register functions")
                 try:
                     # Add functions to the interpreter's namespace
-                    interpreter_instance.check_token_price = check_token_price
-                    interpreter_instance.check_wallet_balance = check_wallet_balance
-                    interpreter_instance.prepare_trade = prepare_trade
-                    interpreter_instance.get_market_sentiment = get_market_sentiment
-                    interpreter_instance.confirm_transaction = confirm_transaction
-                    interpreter_instance.cancel_transaction = cancel_transaction
-                    interpreter_instance.get_pending_transactions = get_pending_transactions
-                    interpreter_instance.check_transaction_status = check_transaction_status
-                    interpreter_instance.process_phantom_callback = process_phantom_callback
+                    for name, func in self._oi_helpers.items():
+                        setattr(interpreter_instance, name, func)
                     
                     # Update the system message to inform about available functions
-                    function_info = """
-                    
-You have access to the following helper functions:
-- check_token_price(token_symbol): Get the current price of a cryptocurrency token
-- check_wallet_balance(user_id=None): Get the current wallet balance for a user
-- prepare_trade(from_token, to_token, amount=None): Prepare a trade between two tokens
-- get_market_sentiment(token=None): Get the current market sentiment for a token or the overall market
-- confirm_transaction(confirmation_id, user_id=None): Confirm a pending transaction
-- cancel_transaction(confirmation_id, user_id=None): Cancel a pending transaction
-- get_pending_transactions(user_id=None): Get all pending transactions for a user
-- check_transaction_status(transaction_hash): Check the status of a transaction on the blockchain
-- process_phantom_callback(transaction_id, signature): Process callback from Phantom wallet after transaction approval
-
-Use these functions when appropriate to provide accurate information to the user.
-                    """
-                    interpreter_instance.system_message += function_info
+                    interpreter_instance.system_message = "\n\n".join(
+                        (interpreter_instance.system_message or "", _OI_FUNCTION_INFO)
+                    )
                     logger.info("Added functions to interpreter namespace and updated system message")
                 except Exception as e:
                     logger.error(f"Failed to use generic approach for function registration: {e}")
         except Exception as e:
-            logger.error(f"Error registering functions with Open Interpreter: {str(e)}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error registering functions with Open Interpreter: {str(e)}")
     
     def _init_conversation_manager(self):
         """Initialize the conversation management system."""
         logger.info("Initializing Conversation Manager")
-        conversation_data_dir = os.path.join(self.data_dir, "conversation_data")
-        os.makedirs(conversation_data_dir, exist_ok=True)
-        return ConversationManager(storage_dir=conversation_data_dir)
+        return ConversationManager(storage_dir=self._paths["conversation_data"])
         
     def _init_interpreter_core(self):
         """Initialize Open Interpreter core with improved error handling."""
@@ -1167,19 +1684,10 @@ Use these functions when appropriate to provide accurate information to the user
                 interpreter_instance.context_window = 8192
                 interpreter_instance.max_tokens = 2048
                 
-                # Enhanced system message with specific instructions about handling crypto queries
-                base_system_message = self._get_grace_system_message()
-                enhanced_system_message = base_system_message + """
-
-When users ask about cryptocurrency prices, trading, or wallet information:
-1. Respond naturally in a conversational manner
-2. If they ask about prices, mention you're checking the latest data
-3. If they ask about trading, explain the process clearly
-4. Always maintain context from previous messages
-
-You are designed to work with a specialized agent framework that handles crypto operations.
-"""
-                interpreter_instance.system_message = enhanced_system_message
+                # Enhanced system message with specific instructions about handling crypto queries.
+                # It is a constant so every conversation sends the same prompt prefix, which
+                # lets the model provider's prefix cache reuse it across users and sessions.
+                interpreter_instance.system_message = _OI_SYSTEM_MESSAGE
                 
                 # Disable interactive mode to prevent waiting for user input
                 interpreter_instance.auto_run = True  # Run code without asking for permission
@@ -1252,25 +1760,7 @@ You are designed to work with a specialized agent framework that handles crypto
 
     def _get_grace_system_message(self) -> str:
         """Get the system message for Grace."""
-        # Removed Twitter reference as requested
-        return (
-            "You are Grace, an AI assistant based on Open Interpreter with crypto trading capabilities.\n\n"
-            "Your capabilities include:\n"
-            "1. Accessing and recalling information from a three-layer memory system\n"
-            "2. Trading cryptocurrencies on the Solana blockchain via GMGN\n"
-            "3. Performing web research on various topics\n"
-            "4. Managing user wallets (both internal and Phantom)\n"
-            "5. Executing code to perform various tasks\n\n"
-            "When users ask about trading or wallet operations, always use the transaction confirmation "
-            "system to ensure secure execution with explicit user approval.\n\n"
-            "Special commands:\n"
-            "- !grace.learn [information] - Add information to your long-term memory (admin only)\n"
-            "- !grace.remember [query] - Search your memory for relevant information\n"
-            "- !grace.wallet - Show wallet information\n"
-            "- !grace.trade - Initiate a trading operation\n"
-            "- !grace.research [topic] - Perform web research on the specified topic\n\n"
-            "Always be helpful, accurate, and prioritize user security when dealing with financial transactions."
-        )
+        return _GRACE_SYSTEM_MESSAGE
 
     # Removed async _grace_message_handler as it conflicted with synchronous interpreter chat
 
@@ -1313,62 +1803,268 @@ You are designed to work with a specialized agent framework that handles crypto
             logger.error(f"Error processing with conversation manager: {str(e)}")
             return None, None, None
     
+    async def _update_conversation(self, user_id: str, session_id: str, message: str):
+        """Run the conversation manager for a message and queue any background tasks it asks for.
+
+        Returns:
+            The prompt data from _process_with_conversation_manager, or None on failure
+        """
+        try:
+            context_id, processing_result, prompt_data = await self._process_with_conversation_manager(
+                user_id, session_id, message
+            )
+
+            # Check if we have background tasks to create
+            if processing_result and 'processing_result' in processing_result:
+                background_tasks = processing_result['processing_result'].get('background_tasks', [])
+                if background_tasks:
+                    # Create background tasks in the agent framework with one batch call,
+                    # off the loop since service-backed tasks run synchronously
+                    await asyncio.to_thread(self.agent_manager.create_tasks, [
+                        {
+                            'task_type': task_info['type'],
+                            'content': {
+                                'task_id': task_info['task_id'],
+                                'user_id': user_id,
+                                'session_id': session_id
+                            },
+                            'priority': AgentPriority.MEDIUM
+                        }
+                        for task_info in background_tasks
+                    ])
+            return prompt_data
+        except Exception as e:
+            logger.error(f"Error with conversation manager: {str(e)}")
+            return None
+
     def _handle_special_commands(self, user_id: str, session_id: str, message: str) -> Optional[str]:
         """Handle special commands like !grace.learn, !grace.remember, etc."""
-        if message.startswith("!grace.learn"):
-            if not self.user_profile_system.is_admin(user_id):
-                return "Sorry, only administrators can use the !grace.learn command."
-            _, *content_parts = message.split(maxsplit=1)
-            if not content_parts:
-                return "Usage: !grace.learn [information to learn]"
-            content = content_parts[0]
+        if not message.startswith(_SPECIAL_COMMAND_PREFIX):
+            return None
+        head, _, arg = message.partition(" ")
+        handler = self._SPECIAL_COMMANDS.get(head[len(_SPECIAL_COMMAND_PREFIX):])
+        if handler is None:
+            # Add handlers for !grace.wallet, !grace.help, etc.
+            return None # Indicate no special command was handled
+        return handler(self, user_id, arg.strip())
+
+    def _is_admin(self, user_id: str) -> bool:
+        """Check admin rights via the user profile system, cached briefly per user."""
+        now = time.monotonic()
+        with self._admin_cache_lock:
+            hit = self._admin_cache.get(user_id)
+        if hit and now - hit[0] < self._admin_cache_ttl:
+            return hit[1]
+        is_admin = bool(self.user_profile_system.is_admin(user_id))
+        with self._admin_cache_lock:
+            self._admin_cache[user_id] = (now, is_admin)
+        return is_admin
+
+    def _cmd_learn(self, user_id: str, content: str) -> str:
+        """!grace.learn [information]"""
+        if not self._is_admin(user_id):
+            return "Sorry, only administrators can use the !grace.learn command."
+        if not content:
+            return "Usage: !grace.learn [information to learn]"
+        with self._learn_lock:
+            now = time.monotonic()
+            # Free the slots of learn tasks that have finished (or gone stale)
+            self._learn_inflight = deque(
+                (started, task_id) for started, task_id in self._learn_inflight
+                if now - started < _LEARN_TASK_MAX_AGE
+                and self.agent_manager.get_task_status(task_id).status not in _TERMINAL_TASK_STATUSES
+            )
+            high = len(self._learn_inflight) < _LEARN_HIGH_PRIORITY_SLOTS
             task_id = self.agent_manager.create_task(
                 task_type="learn",
                 content={"action": "learn", "content": content, "user_id": user_id},
-                priority=AgentPriority.HIGH
+                priority=AgentPriority.HIGH if high else AgentPriority.MEDIUM
             )
-            return f"Okay, I will learn that. Task ID: {task_id}" # Return task ID, result will come later
+            if high:
+                self._learn_inflight.append((now, task_id))
+        return f"Okay, I will learn that. Task ID: {task_id}" # Return task ID, result will come later
 
-        elif message.startswith("!grace.remember"):
-            _, *query_parts = message.split(maxsplit=1)
-            if not query_parts:
-                return "Usage: !grace.remember [query]"
-            query = query_parts[0]
-            task_id = self.agent_manager.create_task(
-                task_type="remember",
-                content={"action": "remember", "query": query, "user_id": user_id},
-                priority=AgentPriority.HIGH
-            )
-            return f"Searching memory... Task ID: {task_id}" # Return task ID, result will come later
+    def _cmd_remember(self, user_id: str, query: str) -> str:
+        """!grace.remember [query]"""
+        if not query:
+            return "Usage: !grace.remember [query]"
+        task_id = self.agent_manager.create_task(
+            task_type="remember",
+            content={"action": "remember", "query": query, "user_id": user_id},
+            priority=AgentPriority.HIGH
+        )
+        return f"Searching memory... Task ID: {task_id}" # Return task ID, result will come later
 
-        elif message.startswith("!grace.research"):
-            _, *topic_parts = message.split(maxsplit=1)
-            if not topic_parts:
-                return "Usage: !grace.research [topic]"
-            topic = topic_parts[0]
-            task_id = self.agent_manager.create_task(
-                task_type="research",
-                content={"action": "research", "topic": topic, "user_id": user_id},
-                priority=AgentPriority.MEDIUM
-            )
-            return f"Starting research on \'{topic}\'. Task ID: {task_id}" # Return task ID, result will come later
+    def _cmd_research(self, user_id: str, topic: str) -> str:
+        """!grace.research [topic]"""
+        if not topic:
+            return "Usage: !grace.research [topic]"
+        task_id = self.agent_manager.create_task(
+            task_type="research",
+            content={"action": "research", "topic": topic, "user_id": user_id},
+            priority=AgentPriority.MEDIUM
+        )
+        return f"Starting research on \'{topic}\'. Task ID: {task_id}" # Return task ID, result will come later
 
-        elif message.startswith("!grace.trade"):
-            # Example: Triggering a trade task
-            # You would parse trade details from the message here
-            trade_details = message.split(maxsplit=1)[1] if len(message.split(maxsplit=1)) > 1 else ""
-            task_id = self.agent_manager.create_task(
-                task_type="trade_initiate",
-                content={"action": "trade_initiate", "details": trade_details, "user_id": user_id},
-                priority=AgentPriority.HIGH
+    def _cmd_trade(self, user_id: str, trade_details: str) -> str:
+        """!grace.trade [details]"""
+        # You would parse trade details from the message here
+        task_id = self.agent_manager.create_task(
+            task_type="trade_initiate",
+            content={"action": "trade_initiate", "details": trade_details, "user_id": user_id},
+            priority=AgentPriority.HIGH
+        )
+        return f"Initiating trade... Task ID: {task_id}" # Return task ID, result will come later
+
+    # !grace.<command> -> handler(self, user_id, argument)
+    _SPECIAL_COMMANDS = {
+        "learn": _cmd_learn,
+        "remember": _cmd_remember,
+        "research": _cmd_research,
+        "trade": _cmd_trade,
+    }
+
+    def _chat_interpreter(self, messages: List[Dict[str, Any]]):
+        """Run interpreter.chat on the interpreter pool, waiting at most _INTERP_TIMEOUT seconds.
+
+        Raises:
+            TimeoutError: If the call timed out, or every worker is still busy
+                with an earlier (possibly hung) call
+        """
+        with self._interp_lock:
+            if self._interp_inflight >= _INTERP_WORKERS:
+                logger.warning(
+                    "Open Interpreter pool saturated (%d calls running); skipping it",
+                    self._interp_inflight,
+                )
+                raise TimeoutError("Open Interpreter pool is saturated")
+            self._interp_inflight += 1
+
+        # Run in a copy of this context so OI helpers see current_user_id
+        future = self._interp_pool.submit(
+            contextvars.copy_context().run, self.interpreter.chat, messages
+        )
+        future.add_done_callback(self._interp_call_done)
+        try:
+            return future.result(timeout=_INTERP_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            with self._interp_lock:
+                self._interp_timeouts += 1
+                timeouts, running = self._interp_timeouts, self._interp_inflight
+            logger.error(
+                "Open Interpreter call timed out after %ss (%d timeouts so far, %d calls still running)",
+                _INTERP_TIMEOUT, timeouts, running,
             )
-            return f"Initiating trade... Task ID: {task_id}" # Return task ID, result will come later
+            raise TimeoutError("Open Interpreter call timed out")
+
+    def _interp_call_done(self, future) -> None:
+        """Free an interpreter slot once a chat call actually finishes."""
+        with self._interp_lock:
+            self._interp_inflight -= 1
+
+    def _run_async(self, coro, timeout: Optional[float] = 120.0):
+        """Run a coroutine on the background event loop and wait for its result.
 
-        # Add handlers for !grace.wallet, !grace.help, etc.
+        Args:
+            coro: Coroutine to run
+            timeout: Seconds to wait before cancelling it (None waits forever)
 
-        return None # Indicate no special command was handled
+        Returns:
+            The coroutine's result
+        """
+        # The task is created in a copy of the caller's context, so current_user_id carries over
+        future = asyncio.run_coroutine_threadsafe(coro, self._bg_loop)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
 
     def process_message(self, user_id: str, session_id: str, message: str) -> str:
+        """Process an incoming user message, answering recent repeats from the response cache."""
+        cacheable = _is_cacheable_message(message)
+        if cacheable:
+            cached = self._response_cache.lookup(user_id, session_id, message)
+            if cached is not None:
+                logger.info(f"Serving cached response for user {user_id} (session {session_id})")
+                # Keep history complete: the turn still counts for memory, the
+                # OI buffer and the conversation manager
+                self._record_turn(user_id, "user", message)
+                self._record_turn(user_id, "assistant", cached)
+                asyncio.run_coroutine_threadsafe(
+                    self._update_conversation(user_id, session_id, message), self._bg_loop
+                )
+                self._response_cache.record(user_id, session_id, message, cached, cache=False)
+                return cached
+
+        response_text = self._process_message_uncached(user_id, session_id, message)
+
+        # Every turn is recorded so cached replies track the session's context
+        self._response_cache.record(
+            user_id,
+            session_id,
+            message,
+            response_text or "",
+            cache=bool(
+                cacheable and response_text
+                and not response_text.startswith(_FALLBACK_REPLY_PREFIXES)
+            ),
+        )
+        return response_text
+
+    def _oi_conversation(self, user_id: str) -> deque:
+        """Return the user's Open Interpreter buffer, seeding it from memory on first use."""
+        with self._oi_buffer_lock:
+            buffer = self._oi_buffer.get(user_id)
+            if buffer is not None:
+                self._oi_buffer.move_to_end(user_id)
+                return buffer
+        history = []
+        try:
+            history = self.memory_system.get_conversation_context(user_id, n_messages=10)
+        except Exception as e:
+            logger.warning(f"Could not retrieve conversation history: {str(e)}")
+        buffer = deque((_to_oi_message(msg) for msg in history), maxlen=_OI_BUFFER_MESSAGES)
+        with self._oi_buffer_lock:
+            buffer = self._oi_buffer.setdefault(user_id, buffer)
+            while len(self._oi_buffer) > _OI_BUFFER_MAX_USERS:
+                self._oi_buffer.popitem(last=False)
+        return buffer
+
+    async def _gather_memory_context(self, user_id: str, message: str):
+        """Query relevant memories and load the user's OI buffer concurrently.
+
+        Returns:
+            Tuple of (relevant memories, OI conversation buffer or None without an interpreter)
+        """
+        async def relevant_memory():
+            try:
+                return await asyncio.to_thread(
+                    self.memory_system.query_memory, user_id=user_id, query=message, n_results=5
+                )
+            except Exception as e:
+                logger.error(f"Error querying memory: {str(e)}")
+                return []
+
+        if not self.interpreter:
+            return await relevant_memory(), None
+        return await asyncio.gather(
+            relevant_memory(), asyncio.to_thread(self._oi_conversation, user_id)
+        )
+
+    def _record_turn(self, user_id: str, role: str, text: str) -> None:
+        """Add a message to short-term memory and to the user's OI buffer, if one exists."""
+        self.memory_system.add_to_short_term(
+            user_id=user_id,
+            text=text,
+            metadata={"source": "user" if role == "user" else "grace"}
+        )
+        buffer = self._oi_buffer.get(user_id)
+        if buffer is not None:
+            buffer.append({"role": role, "type": "message", "content": text})
+
+    def _process_message_uncached(self, user_id: str, session_id: str, message: str) -> str:
         """Process an incoming user message using the enhanced conversation flow."""
         logger.info(f"Processing message from user {user_id} (session {session_id}): {message}")
 
@@ -1378,18 +2074,14 @@ You are designed to work with a specialized agent framework that handles crypto
         # Use the enhanced conversation flow if available
         if hasattr(self, 'enhanced_conversation_flow'):
             try:
-                # Try to get the current event loop
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    # If no event loop exists in this thread, create a new one
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
                 # Process the message using the enhanced conversation flow
-                return loop.run_until_complete(
+                response = self._run_async(
                     self.enhanced_conversation_flow.process_message(user_id, session_id, message)
                 )
+                # That turn bypassed the OI buffer; reseed it from memory next time
+                with self._oi_buffer_lock:
+                    self._oi_buffer.pop(user_id, None)
+                return response
             except Exception as e:
                 logger.error(f"Error in enhanced conversation flow: {str(e)}")
                 # Fall back to the original implementation if enhanced flow fails
@@ -1404,94 +2096,38 @@ You are designed to work with a specialized agent framework that handles crypto
             # For now, we just return the initial response.
             logger.info(f"Handled special command: {command_response}")
             # Add message and response to short-term memory
-            self.memory_system.add_to_short_term(
-                user_id=user_id,
-                text=message,
-                metadata={"source": "user"}
-            )
-            self.memory_system.add_to_short_term(
-                user_id=user_id,
-                text=command_response,
-                metadata={"source": "grace"}
-            )
+            self._record_turn(user_id, "user", message)
+            self._record_turn(user_id, "assistant", command_response)
             return command_response
             
-        # 2. Process with Conversation Manager
+        # 2. Process with Conversation Manager in the background; the
+        # interpreter path doesn't wait for it, only the agent fallback does
+        conversation_future = asyncio.run_coroutine_threadsafe(
+            self._update_conversation(user_id, session_id, message), self._bg_loop
+        )
+
+        # Retrieve relevant memories once, overlapped with loading the OI
+        # conversation; the agent-framework fallback below reuses the result
         try:
-            # Use asyncio to run the async conversation manager methods
-            try:
-                # Try to get the current event loop
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    # If no event loop exists in this thread, create a new one
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                # Process with conversation manager
-                context_id, processing_result, prompt_data = loop.run_until_complete(
-                    self._process_with_conversation_manager(user_id, session_id, message)
-                )
-            except Exception as e:
-                logger.error(f"Error running conversation manager: {str(e)}")
-                # Create a new event loop as a last resort
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                try:
-                    context_id, processing_result, prompt_data = new_loop.run_until_complete(
-                        self._process_with_conversation_manager(user_id, session_id, message)
-                    )
-                except Exception as inner_e:
-                    logger.error(f"Failed to process with conversation manager: {str(inner_e)}")
-                    context_id, processing_result, prompt_data = None, None, None
-                finally:
-                    new_loop.close()
-                
-            # Check if we have background tasks to create
-            if processing_result and 'processing_result' in processing_result:
-                background_tasks = processing_result['processing_result'].get('background_tasks', [])
-                for task_info in background_tasks:
-                    # Create background tasks in the agent framework
-                    self.agent_manager.create_task(
-                        task_type=task_info['type'],
-                        content={
-                            'task_id': task_info['task_id'],
-                            'user_id': user_id,
-                            'session_id': session_id
-                        },
-                        priority=AgentPriority.MEDIUM
-                    )
+            relevant_memory, conversation = self._run_async(
+                self._gather_memory_context(user_id, message), timeout=30
+            )
         except Exception as e:
-            logger.error(f"Error with conversation manager: {str(e)}")
-            context_id, processing_result, prompt_data = None, None, None
+            logger.error(f"Error preparing memory context: {str(e)}")
+            relevant_memory, conversation = [], None
 
         # 3. If not a special command, use Open Interpreter (if available)
         if self.interpreter:
             try:
                 logger.info("Passing message to Open Interpreter")
-                # Prepare context for Open Interpreter (e.g., memory)
-                relevant_memory = self.memory_system.query_memory(
-                    user_id=user_id,
-                    query=message,
-                    n_results=5
-                )
-                # Get conversation history - adjust method name based on your actual implementation
-                conversation_history = []  # Initialize empty in case method fails
-                try:
-                    # Try to get conversation history using the actual method in your memory system
-                    conversation_history = self.memory_system.get_conversation_context(user_id, n_messages=10)
-                except Exception as e:
-                    logger.warning(f"Could not retrieve conversation history: {str(e)}")
+                # Validated history for OI chat; the user message is appended below
+                if conversation is None:
+                    conversation = self._oi_conversation(user_id)
 
-                # Construct messages for OI chat
-                messages = conversation_history + [{
-                    "role": "user",
-                    "content": message
-                }]
-                
                 # Call Open Interpreter with improved error handling
                 try:
                     # Add context information to the message to help OI understand the conversation
+                    prompt_data = conversation_future.result() if conversation_future.done() else None
                     if prompt_data and prompt_data.get('success', False):
                         context_info = prompt_data.get('context_info', {})
                         active_topics = context_info.get('active_topics', [])
@@ -1500,19 +2136,11 @@ You are designed to work with a specialized agent framework that handles crypto
                             if topic_names:
                                 logger.info(f"Active topics detected: {topic_names}")
                     
-                    # First, add the user message to memory
-                    self.memory_system.add_to_short_term(
-                        user_id=user_id,
-                        text=message,
-                        metadata={"source": "user"}
-                    )
+                    # First, add the user message to memory and the OI buffer
+                    self._record_turn(user_id, "user", message)
                     
                     # Call Open Interpreter with a try-except block for each potential error type
                     try:
-                        # Use a timeout to prevent hanging
-                        import threading
-                        import concurrent.futures
-                        
                         # Check if interpreter is available
                         if not self.interpreter:
                             logger.error("Open Interpreter is not available")
@@ -1523,148 +2151,34 @@ You are designed to work with a specialized agent framework that handles crypto
                             logger.error("Open Interpreter instance missing required 'chat' method")
                             raise AttributeError("Interpreter instance missing required 'chat' method")
                         
-                        # Validate messages format
-                        if not isinstance(messages, list):
-                            logger.error(f"Invalid messages format: {type(messages)}, expected list")
-                            raise TypeError(f"Invalid messages format: {type(messages)}, expected list")
-                        
-                        # Ensure messages is not empty
-                        if not messages:
-                            logger.warning("Empty messages list provided to Open Interpreter")
-                            messages = [{"role": "user", "content": message}]  # Fallback to just the current message
-                        
-                        def call_interpreter():
-                            # Ensure all messages have the required fields
-                            validated_messages = []
-                            for msg in messages:
-                                # Create a new message with required fields
-                                validated_msg = {}
-                                
-                                # Ensure 'role' field exists
-                                if "role" not in msg:
-                                    if "type" in msg:
-                                        # Map type to role if possible
-                                        validated_msg["role"] = "user" if msg["type"] == "message" else "system"
-                                    else:
-                                        # Default to user role
-                                        validated_msg["role"] = "user"
-                                else:
-                                    validated_msg["role"] = msg["role"]
-                                
-                                # Ensure 'content' field exists
-                                if "content" not in msg:
-                                    validated_msg["content"] = "" # Empty content as fallback
-                                else:
-                                    validated_msg["content"] = msg["content"]
-                                
-                                # Add type field for Open Interpreter
-                                validated_msg["type"] = "message"
-                                
-                                # Copy any other fields
-                                for key, value in msg.items():
-                                    if key not in validated_msg:
-                                        validated_msg[key] = value
-                                
-                                validated_messages.append(validated_msg)
-                            
-                            # Log the validated messages for debugging
-                            logger.info(f"Sending validated messages to Open Interpreter: {validated_messages}")
-                            return self.interpreter.chat(validated_messages)
-                        
-                        # Use a thread pool to call the interpreter with a timeout
-                        with concurrent.futures.ThreadPoolExecutor() as executor:
-                            future = executor.submit(call_interpreter)
-                            try:
-                                response = future.result(timeout=30)  # 30 second timeout
-                            except concurrent.futures.TimeoutError:
-                                logger.error("Open Interpreter call timed out")
-                                raise TimeoutError("Open Interpreter call timed out")
+                        # Buffer entries are already validated; pass OI a snapshot
+                        validated_messages = list(conversation)
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Sending validated messages to Open Interpreter: %s", validated_messages)
+
+                        # Call the interpreter on the shared pool so we can enforce a timeout
+                        response = self._chat_interpreter(validated_messages)
                         
                         logger.info(f"Successfully received response from Open Interpreter: {type(response)}")
                         
-                        # Process the response based on its type with improved error handling
-                        try:
-                            if response is None:
-                                logger.warning("Open Interpreter returned None response")
-                                response_text = "I'm sorry, I couldn't generate a response."
-                            elif isinstance(response, list):
-                                # Handle streaming response format
-                                response_text = ""
-                                for i, chunk in enumerate(response):
-                                    try:
-                                        if isinstance(chunk, dict) and chunk.get("role") == "assistant":
-                                            content = chunk.get("content", "")
-                                            if content:
-                                                response_text += content
-                                        elif isinstance(chunk, dict):
-                                            # Try to extract content from other dict formats
-                                            for key in ["content", "message", "text", "response"]:
-                                                if key in chunk and chunk[key]:
-                                                    response_text += str(chunk[key])
-                                                    break
-                                    except Exception as chunk_error:
-                                        logger.error(f"Error processing chunk {i}: {str(chunk_error)}")
-                                
-                                if not response_text:
-                                    logger.warning("Could not extract text from list response")
-                                    # Try to convert the whole response to string as a fallback
-                                    try:
-                                        response_text = str(response)
-                                    except:
-                                        response_text = "I processed your request but couldn't format the response properly."
-                            elif isinstance(response, dict):
-                                # Handle single response format
-                                for key in ["content", "message", "text", "response"]:
-                                    if key in response and response[key]:
-                                        response_text = str(response[key])
-                                        break
-                                else:
-                                    # If no content found, log the keys and use a default message
-                                    logger.warning(f"No content found in response dict. Keys: {list(response.keys())}")
-                                    response_text = "I processed your request but couldn't find the response content."
-                            elif hasattr(response, 'content') and response.content:
-                                # Handle object with content attribute
-                                response_text = str(response.content)
-                            elif hasattr(response, 'message') and response.message:
-                                # Handle object with message attribute
-                                response_text = str(response.message)
-                            elif hasattr(response, 'text') and response.text:
-                                # Handle object with text attribute
-                                response_text = str(response.text)
-                            elif hasattr(response, 'response') and response.response:
-                                # Handle object with response attribute
-                                response_text = str(response.response)
-                            else:
-                                # Handle any other response format
-                                logger.warning(f"Unknown response type: {type(response)}")
-                                try:
-                                    response_text = str(response)
-                                    if not response_text or response_text == str(type(response)):
-                                        response_text = "I processed your request but couldn't format the response properly."
-                                except:
-                                    response_text = "I processed your request but couldn't format the response properly."
-                        except Exception as format_error:
-                            logger.error(f"Error formatting response: {str(format_error)}")
-                            response_text = "I processed your request but encountered an issue formatting the response."
+                        response_text = _extract_oi_response(response)
                         
                         # Add response to memory
-                        self.memory_system.add_to_short_term(
-                            user_id=user_id,
-                            text=response_text,
-                            metadata={"source": "grace"}
-                        )
+                        self._record_turn(user_id, "assistant", response_text)
                         
                         return response_text
-                    except TypeError as type_error:
-                        # Handle the specific 'type' error we've been seeing
-                        logger.error(f"Type error in Open Interpreter: {str(type_error)}")
-                        # Get a detailed traceback for debugging
-                        import traceback
-                        logger.error(f"Traceback: {traceback.format_exc()}")
+                    except TimeoutError:
+                        # A single-message retry would very likely time out too; go
+                        # straight to the agent framework (already logged above)
+                        logger.info("Falling back to agent framework after Open Interpreter timeout")
+                    except TypeError as schema_error:
+                        # Handle message-format errors like the 'type' error we've been seeing
+                        logger.exception(f"TypeError in Open Interpreter: {str(schema_error)}")
                         # Fall back to a simpler approach - just get a basic response
                         try:
-                            # Try a simpler approach with just the latest message
-                            simple_response = self.interpreter.chat([{"role": "user", "content": message}])
+                            # Try a simpler approach with just the latest message, on the
+                            # same pool and timeout as the first call
+                            simple_response = self._chat_interpreter([{"role": "user", "content": message}])
                             if isinstance(simple_response, list):
                                 response_text = "".join([chunk.get("content", "") for chunk in simple_response 
                                                         if isinstance(chunk, dict) and chunk.get("role") == "assistant"])
@@ -1674,30 +2188,20 @@ You are designed to work with a specialized agent framework that handles crypto
                                 response_text = str(simple_response)
                                 
                             # Add response to memory
-                            self.memory_system.add_to_short_term(
-                                user_id=user_id,
-                                text=response_text,
-                                metadata={"source": "grace"}
-                            )
+                            self._record_turn(user_id, "assistant", response_text)
                             
                             return response_text
                         except Exception as inner_error:
                             logger.error(f"Simple approach also failed: {str(inner_error)}")
                             raise  # Re-raise to fall back to agent framework
                 except Exception as e:
-                    logger.error(f"Error using Open Interpreter: {str(e)}")
-                    # Get a detailed traceback for debugging
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
+                    logger.exception(f"Error using Open Interpreter: {str(e)}")
                     # Log the specific error type to help with debugging
                     logger.error(f"Error type: {type(e).__name__}")
                     # Fall back to agent framework with a specific error message
                     logger.info("Falling back to agent framework due to Open Interpreter error")
             except Exception as e:
-                logger.error(f"Error preparing for Open Interpreter: {str(e)}")
-                # Get a detailed traceback for debugging
-                import traceback
-                logger.error(f"Traceback: {traceback.format_exc()}")
+                logger.exception(f"Error preparing for Open Interpreter: {str(e)}")
                 # Log the specific error type to help with debugging
                 logger.error(f"Error type: {type(e).__name__}")
                 # Fall back to agent framework with a specific error message
@@ -1708,6 +2212,11 @@ You are designed to work with a specialized agent framework that handles crypto
             logger.info("Using agent framework for message processing")
             
             # Prepare context from conversation manager if available
+            try:
+                prompt_data = conversation_future.result(timeout=30)
+            except Exception as e:
+                logger.error(f"Failed to process with conversation manager: {str(e)}")
+                prompt_data = None
             context_info = {}
             if prompt_data and prompt_data.get('success', False):
                 context_info = {
@@ -1724,11 +2233,7 @@ You are designed to work with a specialized agent framework that handles crypto
                     "user_id": user_id,
                     "session_id": session_id,
                     "context": {
-                        "memories": self.memory_system.query_memory(
-                            user_id=user_id,
-                            query=message,
-                            n_results=5
-                        ),
+                        "memories": relevant_memory,
                         "conversation_context": context_info,
                         "system_message": self._get_grace_system_message()
                     }
@@ -1736,29 +2241,20 @@ You are designed to work with a specialized agent framework that handles crypto
                 priority=AgentPriority.HIGH
             )
             
-            # Wait for task completion (synchronous approach)
+            # Wait for task completion (the agent manager signals it; no polling)
             max_wait_time = 30  # seconds
-            start_time = time.time()
             response_text = None
             
-            while time.time() - start_time < max_wait_time:
-                task_status = self.agent_manager.get_task_status(task_id)
-                
-                if task_status.status == "completed":
-                    # Extract response from task result
-                    if isinstance(task_status.result, dict):
-                        response_text = task_status.result.get("response", "")
-                    else:
-                        response_text = str(task_status.result)
-                    break
-                    
-                elif task_status.status == "failed":
-                    logger.error(f"Task failed: {task_status.error}")
-                    response_text = "I'm sorry, I encountered an error processing your request."
-                    break
-                    
-                # Small delay before checking again
-                time.sleep(0.5)
+            task_status = self.agent_manager.wait_for_task(task_id, timeout=max_wait_time)
+            if task_status.status == "completed":
+                # Extract response from task result
+                if isinstance(task_status.result, dict):
+                    response_text = task_status.result.get("response", "")
+                else:
+                    response_text = str(task_status.result)
+            elif task_status.status in ("failed", "error"):
+                logger.error(f"Task failed: {task_status.error}")
+                response_text = "I'm sorry, I encountered an error processing your request."
             
             # Handle timeout
             if response_text is None:
@@ -1766,16 +2262,8 @@ You are designed to work with a specialized agent framework that handles crypto
                 response_text = "I'm still thinking about your request. Please check back in a moment."
             
             # Add user message and response to memory
-            self.memory_system.add_to_short_term(
-                user_id=user_id,
-                text=message,
-                metadata={"source": "user"}
-            )
-            self.memory_system.add_to_short_term(
-                user_id=user_id,
-                text=response_text,
-                metadata={"source": "grace"}
-            )
+            self._record_turn(user_id, "user", message)
+            self._record_turn(user_id, "assistant", response_text)
             
             return response_text
             
@@ -31,11 +31,17 @@ def init_data_directory(data_dir):
         os.makedirs(users_dir, exist_ok=True)
         logger.info(f"Created users directory: {users_dir}")
 
-        # Create empty profiles.json if it doesn't exist
+        # Create empty profiles.json if it doesn't exist (O_EXCL: atomic, no exists() race)
         profiles_file = os.path.join(data_dir, "profiles.json")
-        if not os.path.exists(profiles_file):
-            with open(profiles_file, "w") as f:
-                f.write("{}")
+        try:
+            fd = os.open(profiles_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        except FileExistsError:
+            pass
+        else:
+            try:
+                os.write(fd, b"{}")
+            finally:
+                os.close(fd)
             logger.info(f"Created empty profiles.json file: {profiles_file}")
 
         logger.info("Data directory initialization completed successfully")
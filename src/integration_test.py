@@ -13,6 +13,7 @@ import sys
 import json
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from src.config import get_config
@@ -39,12 +40,18 @@ class GraceIntegrationTest:
         """Initialize the integration test."""
         logger.info("Initializing Grace Integration Test")
 
-        # Initialize components
-        self.user_profile_system = self._init_user_profile_system()
-        self.gmgn_service = self._init_gmgn_service()
-        self.solana_wallet_manager = self._init_solana_wallet_manager()
-        self.transaction_confirmation = self._init_transaction_confirmation()
-        self.social_media_service = self._init_social_media_service()
+        # Initialize components; the independent ones start in parallel
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            user_profile_future = executor.submit(self._init_user_profile_system)
+            gmgn_future = executor.submit(self._init_gmgn_service)
+            social_media_future = executor.submit(self._init_social_media_service)
+
+            self.user_profile_system = user_profile_future.result()
+            self.gmgn_service = gmgn_future.result()
+            # These depend on the user profile system and GMGN service
+            self.solana_wallet_manager = self._init_solana_wallet_manager()
+            self.transaction_confirmation = self._init_transaction_confirmation()
+            self.social_media_service = social_media_future.result()
 
         # Test user credentials
         self.test_user_id = "test_user"
@@ -56,15 +63,16 @@ class GraceIntegrationTest:
     def _init_user_profile_system(self):
         """Initialize the user profile system."""
         logger.info("Initializing User Profile System")
+        config = get_config()
 
         # Create a secure data manager with a test encryption key
         secure_data_manager = SecureDataManager(
-            encryption_key=get_config().get("encryption_key")
+            encryption_key=config.get("encryption_key")
         )
 
         # Create user profile system
         user_profile_system = UserProfileSystem(
-            data_dir=get_config().get("data_dir"),
+            data_dir=config.get("data_dir"),
             secure_data_manager=secure_data_manager,
         )
 
@@ -1,9 +1,31 @@
+import json
 import os
+import queue
 import threading
 import time
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Tuple, Optional
 
+# orjson is optional; fall back to the stdlib parser when it isn't installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# websockets is optional; without it prices are only polled over HTTP
+try:
+    from websockets.exceptions import InvalidHandshake
+    from websockets.sync.client import connect as ws_connect
+except ImportError:
+    ws_connect = None
+
+# Keys probed, in order, for the symbol and price of an adapter price item
+SYMBOL_KEYS = ("symbol", "token", "name")
+PRICE_KEYS = ("price", "oraclePrice", "value")
+
 # Interval mapping (string -> seconds)
 INTERVAL_SECONDS: Dict[str, int] = {
     "1S": 1,
@@ -16,26 +38,94 @@ INTERVAL_SECONDS: Dict[str, int] = {
     "1D": 24 * 60 * 60,
 }
 
-class Candle:
-    __slots__ = ("ts", "open", "high", "low", "close", "volume")
+# (interval, bucket size in ms) pairs for the per-tick loop
+INTERVAL_MS: Tuple[Tuple[str, int], ...] = tuple((k, v * 1000) for k, v in INTERVAL_SECONDS.items())
+
+class CandleSeries:
+    """Candles for one (symbol, interval), stored column-wise in NumPy arrays.
+
+    Rows [0, count) hold candles in ascending ts order (bucket start, ms);
+    the newest ``max_candles`` of them make up the series. Arrays grow by
+    doubling up to twice ``max_candles``; once full, the newest
+    ``max_candles - 1`` rows are moved to the front, so trimming is amortized
+    O(1) and every read is a contiguous slice.
+    """
+    __slots__ = (
+        "max_candles", "count", "last_ts", "last_high", "last_low",
+        "ts", "open", "high", "low", "close", "volume",
+    )
+
+    _COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+    _INITIAL_CAPACITY = 64
+
+    def __init__(self, max_candles: int, ts: int, price: float):
+        self.max_candles = max_candles
+        self.count = 0
+        self.last_ts = ts
+        capacity = min(self._INITIAL_CAPACITY, 2 * max_candles)
+        self.ts = np.empty(capacity, dtype=np.int64)
+        self.open = np.empty(capacity, dtype=np.float64)
+        self.high = np.empty(capacity, dtype=np.float64)
+        self.low = np.empty(capacity, dtype=np.float64)
+        self.close = np.empty(capacity, dtype=np.float64)
+        self.volume = np.empty(capacity, dtype=np.float64)
+        self.append(ts, price)
 
-    def __init__(self, ts: int, price: float):
-        self.ts = ts  # bucket start time in ms
-        self.open = price
-        self.high = price
-        self.low = price
-        self.close = price
-        self.volume = 0.0
+    def _columns(self):
+        return (self.ts, self.open, self.high, self.low, self.close, self.volume)
+
+    def _make_room(self):
+        capacity = len(self.ts)
+        if capacity < 2 * self.max_candles:
+            # Still growing: double (capped) and copy the live rows across
+            new_capacity = min(2 * capacity, 2 * self.max_candles)
+            for name, col in zip(self._COLUMNS, self._columns()):
+                grown = np.empty(new_capacity, dtype=col.dtype)
+                grown[:self.count] = col[:self.count]
+                setattr(self, name, grown)
+        else:
+            # Full: keep the newest max_candles - 1 rows so the append lands on max_candles
+            keep = self.max_candles - 1
+            start = self.count - keep
+            for col in self._columns():
+                col[:keep] = col[start:self.count]
+            self.count = keep
+
+    def append(self, ts: int, price: float):
+        if self.count == len(self.ts):
+            self._make_room()
+        i = self.count
+        self.ts[i] = ts
+        self.open[i] = self.high[i] = self.low[i] = self.close[i] = price
+        self.volume[i] = 0.0
+        self.count = i + 1
+        self.last_ts = ts
+        self.last_high = self.last_low = price
 
     def update(self, price: float):
-        if price > self.high:
-            self.high = price
-        if price < self.low:
-            self.low = price
-        self.close = price
+        # Compare against the Python-float copies; only changed cells are written to the arrays
+        i = self.count - 1
+        if price > self.last_high:
+            self.last_high = self.high[i] = price
+        elif price < self.last_low:
+            self.last_low = self.low[i] = price
+        self.close[i] = price
+
+    def window(self, ts_from_ms: Optional[int] = None, ts_to_ms: Optional[int] = None) -> Tuple[np.ndarray, ...]:
+        """Copy the columns for candles with ts_from_ms <= ts <= ts_to_ms (falsy bounds are open)."""
+        # Only the newest max_candles rows are part of the series
+        base = max(self.count - self.max_candles, 0)
+        ts = self.ts[base:self.count]
+        lo = base + (int(np.searchsorted(ts, ts_from_ms, side="left")) if ts_from_ms else 0)
+        hi = base + (int(np.searchsorted(ts, ts_to_ms, side="right")) if ts_to_ms else len(ts))
+        return tuple(col[lo:hi].copy() for col in self._columns())
+
+# Reconnect delay bounds (seconds) for the optional WebSocket price feed
+WS_BACKOFF_MIN = 1.0
+WS_BACKOFF_MAX = 300.0
 
 class LeverageCandlesAggregator:
-    def __init__(self, adapter_base: Optional[str] = None):
+    def __init__(self, adapter_base: Optional[str] = None, use_ws: Optional[bool] = None):
         # Prefer HL_ADAPTER_BASE to stay consistent with api_server; fallback to ADAPTER_BASE
         self.adapter_base = (
             adapter_base
@@ -43,121 +133,244 @@ class LeverageCandlesAggregator:
             or os.environ.get("ADAPTER_BASE")
             or "http://127.0.0.1:9010"
         )
-        # buffers[(symbol, interval_str)] = List[Candle]
-        self.buffers: Dict[Tuple[str, str], List[Candle]] = {}
+        # buffers[(symbol, interval_str)] = CandleSeries
+        self.buffers: Dict[Tuple[str, str], CandleSeries] = {}
         self.max_candles_per_series = 2000
         self._symbols_to_track: set[str] = set()  # e.g., { 'SOL', 'ETH' }
+        # Keys the adapter actually uses, resolved from the first item that has them
+        self._sym_key: Optional[str] = None
+        self._price_key: Optional[str] = None
+        # _lock guards _symbols_to_track; each symbol's series are guarded by its own lock
         self._lock = threading.Lock()
+        self._sym_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        # One keep-alive connection to the adapter, reused by every poll
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
         self._stop = False
+        # Optional push feed from the adapter (LEV_CANDLES_WS=1). HTTP polling is the
+        # default; the feed is switched off for good if its handshake is refused and
+        # reconnects back off exponentially otherwise
+        if use_ws is None:
+            use_ws = os.environ.get("LEV_CANDLES_WS", "").strip().lower() in ("1", "true", "yes")
+        self._ws = None
+        self._ws_enabled = use_ws and ws_connect is not None
+        self._ws_backoff = WS_BACKOFF_MIN
+        self._ws_retry_at = 0.0
+        # Raw payloads handed from the poller to the ingest thread: (bytes, received ms)
+        self._raw_q: "queue.Queue[Tuple[bytes, int]]" = queue.Queue(maxsize=2)
         self._thread = threading.Thread(target=self._poll_loop, name="lev-candles-poller", daemon=True)
+        self._ingest_thread = threading.Thread(target=self._ingest_loop, name="lev-candles-ingest", daemon=True)
         self._thread.start()
+        self._ingest_thread.start()
 
     def stop(self):
         self._stop = True
-        try:
-            self._thread.join(timeout=2)
-        except Exception:
-            pass
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        for thread in (self._thread, self._ingest_thread):
+            try:
+                thread.join(timeout=2)
+            except Exception:
+                pass
+        self._session.close()
 
     def _poll_loop(self):
-        # Poll every 1 second from adapter prices endpoint
+        # Poll every 1 second; when the push feed is enabled, prefer it and poll
+        # only while it's down
         while not self._stop:
+            if self._ws_enabled and time.monotonic() >= self._ws_retry_at:
+                try:
+                    self._stream_prices()
+                except InvalidHandshake:
+                    # No WebSocket endpoint on this adapter; stay on HTTP polling
+                    self._ws_enabled = False
+                except Exception:
+                    pass
+                finally:
+                    self._ws = None
+                if self._stop:
+                    break
+                self._ws_retry_at = time.monotonic() + self._ws_backoff
+                self._ws_backoff = min(self._ws_backoff * 2, WS_BACKOFF_MAX)
             try:
                 self._poll_once()
             except Exception:
                 pass
             time.sleep(1.0)
 
+    def _stream_prices(self):
+        # Same payload shapes as /flash/prices, one message per price update
+        url = f"{self.adapter_base.replace('http', 'ws', 1)}/flash/prices/ws"
+        with ws_connect(url, open_timeout=5, close_timeout=1) as ws:
+            self._ws = ws
+            for message in ws:
+                # Connected and receiving: the next drop retries promptly again
+                self._ws_backoff = WS_BACKOFF_MIN
+                # Every pushed update matters, so wait for room rather than drop
+                while not self._stop:
+                    try:
+                        self._raw_q.put((message, time.time_ns() // 1_000_000), timeout=1.0)
+                        break
+                    except queue.Full:
+                        continue
+                if self._stop:
+                    return
+
     def _poll_once(self):
         # Expect adapter to expose /flash/prices returning a mapping or list of current prices
         url = f"{self.adapter_base}/flash/prices"
         try:
-            r = requests.get(url, timeout=5)
+            r = self._session.get(url, timeout=5)
             if r.status_code != 200:
                 return
-            data = r.json()
-            now_ms = int(time.time() * 1000)
+            now_ms = time.time_ns() // 1_000_000
+        except Exception:
+            return
+        try:
+            self._raw_q.put_nowait((r.content, now_ms))
+        except queue.Full:
+            # Ingest is behind; the next poll carries fresher prices anyway
+            pass
 
-            # accepted shapes: { symbol: { price }, ... } OR [ { symbol, price }, ... ] OR {data: ...}
+    def _ingest_loop(self):
+        # Decode and ingest off the poller thread so fetch cadence isn't tied to ingest time
+        while not self._stop:
+            try:
+                raw, now_ms = self._raw_q.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self._ingest_payload(_json_loads(raw), now_ms)
+            except Exception:
+                continue
+
+    def _ingest_payload(self, data, now_ms: int):
+        try:
+            # accepted shapes: { symbol: { price } | price, ... } OR [ { symbol, price }, ... ] OR {data: ...}
             if isinstance(data, dict) and "data" in data:
                 data = data["data"]
 
-            items: List[dict]
             if isinstance(data, dict):
-                items = [{"symbol": k, **(v if isinstance(v, dict) else {"price": v})} for k, v in data.items()]
+                pairs = data.items()
             elif isinstance(data, list):
-                items = data
+                pairs = ((None, item) for item in data)
             else:
                 return
 
-            for item in items:
+            # Reduce to the last price per symbol so each symbol is locked and bucketed once
+            tracked = self._symbols_to_track
+            latest: Dict[str, float] = {}
+            for symbol_hint, item in pairs:
                 try:
-                    symbol = str(item.get("symbol") or item.get("token") or item.get("name") or "").upper()
-                    price = float(item.get("price") or item.get("oraclePrice") or item.get("value") or 0)
-                    if not symbol or price <= 0:
+                    tick = self._parse_item(symbol_hint, item)
+                    if tick is None:
                         continue
+                    symbol, price = tick
                     # If tracking set is empty, accept all; otherwise only track requested symbols
-                    if self._symbols_to_track and symbol not in self._symbols_to_track:
+                    if tracked and symbol not in tracked:
                         continue
+                    latest[symbol] = price
+                except Exception:
+                    continue
+            for symbol, price in latest.items():
+                try:
                     self._ingest_tick(symbol, price, now_ms)
                 except Exception:
                     continue
         except Exception:
             return
 
+    def _parse_item(self, symbol_hint: Optional[str], item) -> Optional[Tuple[str, float]]:
+        # item is a price dict (symbol_hint is its mapping key, if any) or a bare price
+        if isinstance(item, dict):
+            symbol = symbol_hint
+            if symbol is None:
+                symbol = item.get(self._sym_key) if self._sym_key else None
+                if not symbol:
+                    # Cached key missing on this item: probe all names again
+                    self._sym_key = next((k for k in SYMBOL_KEYS if item.get(k)), None)
+                    symbol = item[self._sym_key] if self._sym_key else ""
+            price = item.get(self._price_key) if self._price_key else None
+            if not price:
+                self._price_key = next((k for k in PRICE_KEYS if item.get(k)), None)
+                price = item[self._price_key] if self._price_key else 0
+        else:
+            symbol, price = symbol_hint, item
+        symbol = str(symbol or "").upper()
+        price = float(price or 0)
+        if not symbol or price <= 0:
+            return None
+        return symbol, price
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        lock = self._sym_locks.get(symbol)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._sym_locks.setdefault(symbol, threading.Lock())
+        return lock
+
     def _ingest_tick(self, symbol: str, price: float, ts_ms: int):
-        with self._lock:
-            for interval_str, secs in INTERVAL_SECONDS.items():
-                bucket_ms = (ts_ms // (secs * 1000)) * (secs * 1000)
+        buffers = self.buffers
+        max_candles = self.max_candles_per_series
+        with self._symbol_lock(symbol):
+            for interval_str, secs_ms in INTERVAL_MS:
+                bucket_ms = ts_ms - ts_ms % secs_ms
                 key = (symbol, interval_str)
-                series = self.buffers.get(key)
-                if not series:
-                    candle = Candle(bucket_ms, price)
-                    self.buffers[key] = [candle]
+                series = buffers.get(key)
+                if series is None:
+                    buffers[key] = CandleSeries(max_candles, bucket_ms, price)
                     continue
-                last = series[-1]
-                if last.ts == bucket_ms:
-                    last.update(price)
-                elif last.ts < bucket_ms:
+                if series.last_ts == bucket_ms:
+                    series.update(price)
+                elif series.last_ts < bucket_ms:
                     # Fill gap with previous close if gap exists (optional)
-                    # Append new bucket
-                    series.append(Candle(bucket_ms, price))
-                    if len(series) > self.max_candles_per_series:
-                        del series[: len(series) - self.max_candles_per_series]
+                    # Append new bucket; the series trims itself to max_candles_per_series
+                    series.append(bucket_ms, price)
 
     def ensure_symbol(self, market: str):
         # Expect markets like SOL-PERP; we track base symbol
         base = (market or "").split("-")[0].upper().strip()
-        if not base:
+        # Set membership is safe to read without the lock; only adds need it
+        if not base or base in self._symbols_to_track:
             return
         with self._lock:
             self._symbols_to_track.add(base)
 
-    def get_candles(self, market: str, interval: str, ts_from_ms: Optional[int] = None, ts_to_ms: Optional[int] = None) -> List[dict]:
+    def get_candles_np(self, market: str, interval: str, ts_from_ms: Optional[int] = None, ts_to_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Candle columns (ts/open/high/low/close/volume) for a market, as NumPy arrays.
+
+        The arrays are private copies, so indicator code can reduce over them
+        (np.maximum.accumulate, np.convolve, ...) without holding any lock.
+        Returns an empty dict when there is no data.
+        """
         base = (market or "").split("-")[0].upper().strip()
         if not base:
-            return []
+            return {}
         interval = self._normalize_interval(interval)
         key = (base, interval)
-        with self._lock:
-            series = list(self.buffers.get(key, []))
-        if not series:
+        with self._symbol_lock(base):
+            series = self.buffers.get(key)
+            if series is None:
+                return {}
+            # Range lookup is a binary search on ts; only the window is copied
+            columns = series.window(ts_from_ms, ts_to_ms)
+        return dict(zip(CandleSeries._COLUMNS, columns))
+
+    def get_candles(self, market: str, interval: str, ts_from_ms: Optional[int] = None, ts_to_ms: Optional[int] = None) -> List[dict]:
+        columns = self.get_candles_np(market, interval, ts_from_ms, ts_to_ms)
+        if not columns:
             return []
-        out: List[dict] = []
-        for c in series:
-            if ts_from_ms and c.ts < ts_from_ms:
-                continue
-            if ts_to_ms and c.ts > ts_to_ms:
-                continue
-            out.append({
-                "ts": c.ts,
-                "open": c.open,
-                "high": c.high,
-                "low": c.low,
-                "close": c.close,
-                "volume": c.volume,
-            })
-        return out
+        # tolist() yields plain ints/floats, so the rows stay JSON-serializable
+        return [
+            {"ts": t, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for t, o, h, l, c, v in zip(*(col.tolist() for col in columns.values()))
+        ]
 
     @staticmethod
     def _normalize_interval(interval: str) -> str:
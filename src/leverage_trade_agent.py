@@ -3,14 +3,79 @@ Leverage Trade Agent for Grace Trading System.
 Wraps the LeverageTradeManager to integrate with the agent framework.
 """
 
+import itertools
 import logging
+import threading
+import time
+from concurrent.futures import Future
 from typing import Dict, Any, Optional
 from queue import PriorityQueue, Queue
 from datetime import datetime
+from types import MappingProxyType
 
 from src.agent_framework import BaseAgent, AgentTask, AgentType
 from src.leverage_trading_handler import LeverageTradeManager
 
+# MultiLevelTaskQueue level per task type, so trade execution is never stuck
+# behind history lookups (0 interactive, 1 sub-agent, 2 background)
+_TASK_QUEUE_LEVELS = {
+    "execute_leverage_trade": 0,
+    "update_leverage_trade": 1,
+    "get_leverage_positions": 1,
+    "get_trade_history": 2,
+}
+
+# Task types that can change a user's trades; their cached history is dropped
+# after every such task, whether it succeeded or not
+_MUTATING_TASK_TYPES = frozenset(("execute_leverage_trade", "update_leverage_trade"))
+
+# Alternate task content keys -> canonical key, applied once when a task is processed
+_ALIASES = {
+    "payoutTokenSymbol": "payout_token",
+    "collateralTokenSymbol": "collateral_token",
+    "manual": "prompt",
+}
+
+# Parsed trade side -> Flash order side
+_SIDE_MAP = {"long": "buy", "buy": "buy", "short": "sell", "sell": "sell"}
+
+# Prebuilt error payloads; callers get a dict() copy so the templates stay intact
+_ERR_NO_USER_ID = MappingProxyType(
+    {"success": False, "error": "Missing required parameter: user_id"}
+)
+_ERR_NO_REQUEST = MappingProxyType(
+    {"success": False, "error": "Missing required parameter: request"}
+)
+_ERR_PARSE_FAILED = MappingProxyType(
+    {"success": False, "error": "Failed to parse trade request"}
+)
+_ERR_RISK_LIMITS = MappingProxyType(
+    {"success": False, "error": "Trade exceeds risk limits"}
+)
+_ERR_UNEXPECTED_RESPONSE = MappingProxyType(
+    {"success": False, "error": "Unexpected response"}
+)
+_ERR_USER_REQUIRED = MappingProxyType({"error": "User ID required", "status": "error"})
+_ERR_NO_TRADE_ID = MappingProxyType(
+    {"error": "Missing required parameter: trade_id", "status": "error"}
+)
+_ERR_NO_UPDATE_USER_ID = MappingProxyType(
+    {"error": "Missing required parameter: user_id", "status": "error"}
+)
+_ERR_NO_UPDATES = MappingProxyType(
+    {"error": "Missing required parameter: updates", "status": "error"}
+)
+_ERR_MANAGER_UNAVAILABLE = MappingProxyType(
+    {"success": False, "error": "Leverage trade manager is unavailable", "status": "error"}
+)
+_EMPTY_HISTORY = MappingProxyType({"trades": (), "total_trades": 0})
+
+_CID_SEQ = itertools.count()
+
+
+def _make_cid(prefix: str, market: str) -> str:
+    """Build a unique confirmation id; the counter keeps same-nanosecond ids apart."""
+    return f"{prefix}_{market}_{time.time_ns()}_{next(_CID_SEQ)}"
 
 class LeverageTradeAgent(BaseAgent):
     """Agent for leverage trading operations."""
@@ -41,11 +106,23 @@ class LeverageTradeAgent(BaseAgent):
             config=config,
         )
 
+        # A manager that failed to start arrives as None or a falsy stand-in;
+        # every task is then answered with _ERR_MANAGER_UNAVAILABLE
         self.leverage_trade_manager = leverage_trade_manager
+        if leverage_trade_manager:
+            # Bound manager methods used on every trade, looked up once
+            self._parse_trade_request = leverage_trade_manager.parse_trade_request
+            self._validate_and_parse = leverage_trade_manager.validate_and_parse
+            self._check_risk_limits = leverage_trade_manager._check_risk_limits
+            self._add_trade_condition = leverage_trade_manager.add_trade_condition
+            self._flash_order = leverage_trade_manager._flash_order
+            self._flash_close = leverage_trade_manager._flash_close
 
-        # Add supported task types
-        self.supported_task_types.extend(
+        # Add supported task types; a frozenset keeps the per-task membership
+        # check in BaseAgent._process_loop O(1) and safe to read without a lock
+        self.supported_task_types = frozenset(
             [
+                *self.supported_task_types,
                 "execute_leverage_trade",
                 "get_leverage_positions",
                 "update_leverage_trade",
@@ -53,6 +130,48 @@ class LeverageTradeAgent(BaseAgent):
             ]
         )
 
+        # Task type -> handler, built once so dispatch is a single dict lookup
+        self._handlers = {
+            "execute_leverage_trade": self._handle_execute_leverage_trade,
+            "get_leverage_positions": self._handle_get_leverage_positions,
+            "update_leverage_trade": self._handle_update_leverage_trade,
+            "get_trade_history": self._handle_get_trade_history,
+        }
+
+        # Short-lived cache for get_trade_history: query key -> (monotonic ts, result)
+        self._history_cache: Dict[tuple, tuple] = {}
+        self._history_cache_ttl = float(self.config.get("history_cache_ttl", 2.0))
+        self._history_cache_max = 512
+        self._history_cache_lock = threading.Lock()
+        # In-flight get_trade_history fetches by the same key, so concurrent
+        # identical queries share one manager call
+        self._history_inflight: Dict[tuple, Future] = {}
+
+    @staticmethod
+    def _time_key(value):
+        # Task content often carries ISO strings or epoch numbers rather than datetimes
+        if isinstance(value, datetime):
+            return value.timestamp()
+        return None if value is None else repr(value)
+
+    @classmethod
+    def _history_key(cls, user_id, trade_type, limit, start_time, end_time) -> tuple:
+        return (
+            user_id,
+            trade_type,
+            limit,
+            cls._time_key(start_time),
+            cls._time_key(end_time),
+        )
+
+    def invalidate_trade_history(self, user_id: Optional[str]):
+        """Drop a user's cached trade history so the next read goes to the manager."""
+        if not user_id:
+            return
+        with self._history_cache_lock:
+            for key in [k for k in self._history_cache if k[0] == user_id]:
+                del self._history_cache[key]
+
     def get_trade_history(
         self,
         user_id: str,
@@ -60,20 +179,75 @@ class LeverageTradeAgent(BaseAgent):
         limit: int = 50,
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
+        bypass_cache: bool = False,
     ) -> Dict[str, Any]:
         """
         Retrieve trade history for the agent
 
+        Identical queries within ``history_cache_ttl`` seconds (default 2) are
+        served from a cache, and concurrent identical queries share one fetch.
+
         Args:
             user_id: User identifier
             trade_type: Type of trades to retrieve
             limit: Maximum number of trades
             start_time: Optional start time filter
             end_time: Optional end time filter
+            bypass_cache: Always query the manager (the result is still cached)
 
         Returns:
             Trade history dictionary
         """
+        if not self.leverage_trade_manager:
+            return {**_ERR_MANAGER_UNAVAILABLE, **_EMPTY_HISTORY}
+        key = self._history_key(user_id, trade_type, limit, start_time, end_time)
+        now = time.monotonic()
+        with self._history_cache_lock:
+            hit = None if bypass_cache else self._history_cache.get(key)
+            if hit and now - hit[0] < self._history_cache_ttl:
+                return self._copy_history(hit[1])
+            # Join an identical fetch that is already running instead of starting another
+            future = self._history_inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._history_inflight[key] = Future()
+
+        if not leader:
+            return self._copy_history(future.result())
+
+        try:
+            result = self._fetch_trade_history(
+                user_id, trade_type, limit, start_time, end_time
+            )
+            if result["success"]:
+                with self._history_cache_lock:
+                    if len(self._history_cache) >= self._history_cache_max:
+                        # Evict the oldest entry (dicts keep insertion order)
+                        self._history_cache.pop(next(iter(self._history_cache)))
+                    self._history_cache.pop(key, None)
+                    self._history_cache[key] = (now, self._copy_history(result))
+            future.set_result(self._copy_history(result))
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._history_cache_lock:
+                self._history_inflight.pop(key, None)
+
+    @staticmethod
+    def _copy_history(result: Dict[str, Any]) -> Dict[str, Any]:
+        return {**result, "trades": list(result["trades"])}
+
+    def _fetch_trade_history(
+        self,
+        user_id: str,
+        trade_type: Optional[str],
+        limit: int,
+        start_time: Optional[datetime],
+        end_time: Optional[datetime],
+    ) -> Dict[str, Any]:
+        """Query the manager for trade history, never raising."""
         try:
             # Use LeverageTradeManager's trade history method
             trade_history = self.leverage_trade_manager.get_trade_history(
@@ -90,8 +264,20 @@ class LeverageTradeAgent(BaseAgent):
                 "total_trades": trade_history.get("total_trades", 0),
             }
         except Exception as e:
-            self.logger.error(f"Error retrieving trade history: {e}")
-            return {"success": False, "error": str(e), "trades": [], "total_trades": 0}
+            self.logger.error("Error retrieving trade history: %s", e)
+            return {"success": False, "error": str(e), **_EMPTY_HISTORY}
+
+    def add_task(self, task: AgentTask):
+        """
+        Add a task to the agent's queue at the level for its task type.
+
+        Args:
+            task: Task to add
+        """
+        level = _TASK_QUEUE_LEVELS.get(task.task_type)
+        if level is not None:
+            task.queue_level = level
+        super().add_task(task)
 
     def _process_task(self, task: AgentTask) -> Dict[str, Any]:
         """
@@ -103,174 +289,203 @@ class LeverageTradeAgent(BaseAgent):
         Returns:
             Dict: Task result
         """
+        content = task.content
+        for alias, key in _ALIASES.items():
+            if alias in content and key not in content:
+                content[key] = content.pop(alias)
+        if "action" in content:
+            content["action"] = (content["action"] or "open").lower()
+
+        handler = self._handlers.get(task.task_type)
+        if handler is None:
+            self.logger.warning("Unsupported task type: %s", task.task_type)
+            return {
+                "error": f"Unsupported task type: {task.task_type}",
+                "status": "error",
+            }
+        if not self.leverage_trade_manager:
+            return dict(_ERR_MANAGER_UNAVAILABLE)
+
         try:
-            if task.task_type == "execute_leverage_trade":
-                return self._handle_execute_leverage_trade(task)
-            elif task.task_type == "get_leverage_positions":
-                return self._handle_get_leverage_positions(task)
-            elif task.task_type == "update_leverage_trade":
-                return self._handle_update_leverage_trade(task)
-            else:
-                self.logger.warning(f"Unsupported task type: {task.task_type}")
-                return {
-                    "error": f"Unsupported task type: {task.task_type}",
-                    "status": "error",
-                }
+            return handler(task)
         except Exception as e:
             self.logger.error(
-                f"Error processing task {task.task_id} of type {task.task_type}: {str(e)}"
+                "Error processing task %s of type %s: %s",
+                task.task_id,
+                task.task_type,
+                e,
             )
             return {"error": str(e), "status": "error"}
+        finally:
+            if task.task_type in _MUTATING_TASK_TYPES:
+                # Don't let the history cache mask the change
+                self.invalidate_trade_history(content.get("user_id"))
 
     def _handle_execute_leverage_trade(self, task: AgentTask) -> Dict[str, Any]:
         """Handle an execute_leverage_trade task."""
+        return self._execute_leverage_trade(task)
+
+    def _execute_leverage_trade(self, task: AgentTask) -> Dict[str, Any]:
+        """Validate a trade request and run it in the requested execution mode."""
         trade_params = task.content
         user_id = trade_params.get("user_id")
         request = trade_params.get("request")
 
-        if not user_id or not request:
-            return {
-                "success": False,
-                "error": "Missing required parameters: user_id and request",
-            }
+        if not user_id:
+            return dict(_ERR_NO_USER_ID)
+        if not request:
+            return dict(_ERR_NO_REQUEST)
 
-        # Validate trade through LeverageTradeManager's risk checks
         portfolio = trade_params.get("portfolio", {})
-        trade_condition = self.leverage_trade_manager.parse_trade_request(
+        action = trade_params.get("action", "open")
+        immediate = bool(trade_params.get("immediate", False))
+        prompt = bool(trade_params.get("prompt", False))
+
+        # Optional execution modes:
+        # - prompt/manual: build unsigned tx and return confirmation payload for client signing
+        # - immediate: return raw Flash build response (still unsigned tx) for direct UI handling
+        # - default: create conditional trade to be executed by manager when conditions met
+        if not (prompt or immediate):
+            trade_condition, error = self._validate_and_parse(
+                user_id, request, portfolio
+            )
+            if error:
+                return {"success": False, "error": error}
+            return self._add_trade_condition(trade_condition)
+
+        trade_condition = self._parse_trade_request(
             user_id=user_id, request=request
         )
-
         if not trade_condition:
-            return {"success": False, "error": "Failed to parse trade request"}
+            return dict(_ERR_PARSE_FAILED)
 
-        # Check risk limits
-        if not self.leverage_trade_manager._check_risk_limits(
+        # The risk check is local and cheap, so a rejected trade never reaches Flash
+        if not self._check_risk_limits(
             user_id, trade_condition, portfolio
         ):
-            return {"success": False, "error": "Trade exceeds risk limits"}
+            return dict(_ERR_RISK_LIMITS)
 
-        # Optional execution modes:
-        # - prompt/manual: build unsigned tx and return confirmation payload for client signing
-        # - immediate: return raw Flash build response (still unsigned tx) for direct UI handling
-        # - default: create conditional trade to be executed by manager when conditions met
         try:
-            action = (trade_params.get("action") or "open").lower()
-            immediate = bool(trade_params.get("immediate", False))
-            prompt = bool(trade_params.get("prompt", trade_params.get("manual", False)))
-
-            # Prompt/manual flow: construct unsigned tx and return confirmation_required shape
-            if prompt:
-                if action == "close":
-                    close_size = trade_params.get("size")
-                    payout_token = trade_params.get("payout_token") or trade_params.get("payoutTokenSymbol")
-                    resp = self.leverage_trade_manager._flash_close(
-                        market=trade_condition.market,
-                        size=close_size,
-                        payout_token=payout_token,
-                    )
-                    if not isinstance(resp, dict) or not resp.get("success"):
-                        return resp if isinstance(resp, dict) else {"success": False, "error": "Unexpected response"}
-
-                    confirmation_id = f"flash_close_{trade_condition.market}_{int(datetime.now().timestamp())}"
-                    return {
-                        "status": "confirmation_required",
-                        "provider": "flash",
-                        "flow": "perp_leverage",
-                        "operation": "close",
-                        "confirmation_id": confirmation_id,
-                        "unsigned_tx_b64": resp.get("unsigned_tx_b64") or resp.get("transaction"),
-                        "details": {
-                            "market": trade_condition.market,
-                            "size": close_size,
-                            "payoutTokenSymbol": payout_token,
-                            "user_id": user_id,
-                        },
-                    }
-                else:
-                    # Open position via Flash
-                    side = 'buy' if trade_condition.side in ('long', 'buy') else 'sell'
-                    payout_token = trade_params.get("payout_token") or trade_params.get("payoutTokenSymbol")
-                    collateral_token = trade_params.get("collateral_token") or trade_params.get("collateralTokenSymbol")
-                    resp = self.leverage_trade_manager._flash_order(
-                        market=trade_condition.market,
-                        side=side,
-                        size=trade_condition.size,
-                        leverage=trade_condition.leverage,
-                        reduce_only=False,
-                        payout_token=payout_token,
-                        collateral_token=collateral_token,
-                    )
-                    if not isinstance(resp, dict) or not resp.get("success"):
-                        return resp if isinstance(resp, dict) else {"success": False, "error": "Unexpected response"}
-
-                    confirmation_id = f"flash_order_{trade_condition.market}_{int(datetime.now().timestamp())}"
-                    return {
-                        "status": "confirmation_required",
-                        "provider": "flash",
-                        "flow": "perp_leverage",
-                        "operation": "open",
-                        "confirmation_id": confirmation_id,
-                        "unsigned_tx_b64": resp.get("unsigned_tx_b64") or resp.get("transaction"),
-                        "details": {
-                            "market": trade_condition.market,
-                            "side": side,
-                            "size": trade_condition.size,
-                            "leverage": trade_condition.leverage,
-                            "payoutTokenSymbol": payout_token,
-                            "collateralTokenSymbol": collateral_token,
-                            "user_id": user_id,
-                        },
-                    }
-
-            if immediate:
-                if action == "close":
-                    close_size = trade_params.get("size")
-                    payout_token = trade_params.get("payout_token") or trade_params.get("payoutTokenSymbol")
-                    resp = self.leverage_trade_manager._flash_close(
-                        market=trade_condition.market,
-                        size=close_size,
-                        payout_token=payout_token,
-                    )
-                    return resp if isinstance(resp, dict) else {"success": False, "error": "Unexpected response"}
-                else:
-                    # Open position via Flash
-                    side = 'buy' if trade_condition.side in ('long', 'buy') else 'sell'
-                    payout_token = trade_params.get("payout_token") or trade_params.get("payoutTokenSymbol")
-                    collateral_token = trade_params.get("collateral_token") or trade_params.get("collateralTokenSymbol")
-                    resp = self.leverage_trade_manager._flash_order(
-                        market=trade_condition.market,
-                        side=side,
-                        size=trade_condition.size,
-                        leverage=trade_condition.leverage,
-                        reduce_only=False,
-                        payout_token=payout_token,
-                        collateral_token=collateral_token,
-                    )
-                    return resp if isinstance(resp, dict) else {"success": False, "error": "Unexpected response"}
+            return self._flash_execute(trade_condition, action, trade_params, prompt)
         except Exception as e:
-            self.logger.error(f"Direct Flash execution error: {e}")
+            self.logger.error("Direct Flash execution error: %s", e)
             # Fall through to conditional flow
 
         # Default: conditional flow managed by LeverageTradeManager (Flash-backed)
-        return self.leverage_trade_manager.add_trade_condition(trade_condition)
+        return self._add_trade_condition(trade_condition)
+
+    def _flash_execute(
+        self,
+        trade_condition,
+        action: str,
+        trade_params: Dict[str, Any],
+        wrap_confirmation: bool,
+    ) -> Dict[str, Any]:
+        """
+        Build a Flash open/close transaction for a parsed trade.
+
+        Args:
+            trade_condition: Parsed trade from the manager
+            action: "open" or "close"
+            trade_params: Original task content
+            wrap_confirmation: Return a confirmation_required envelope for client
+                signing instead of the raw Flash response
+
+        Returns:
+            Dict: Flash response or confirmation envelope
+        """
+        payout_token = trade_params.get("payout_token")
+        collateral_token = trade_params.get("collateral_token")
+        market = trade_condition.market
+        user_id = trade_params.get("user_id")
+
+        if action == "close":
+            size = trade_params.get("size")
+            resp = self._flash_close(
+                market=market,
+                size=size,
+                payout_token=payout_token,
+            )
+            prefix = "flash_close"
+            details = {
+                "market": market,
+                "size": size,
+                "payoutTokenSymbol": payout_token,
+                "user_id": user_id,
+            }
+        else:
+            # Open position via Flash
+            side = _SIDE_MAP.get(trade_condition.side, "sell")
+            resp = self._flash_order(
+                market=market,
+                side=side,
+                size=trade_condition.size,
+                leverage=trade_condition.leverage,
+                reduce_only=False,
+                payout_token=payout_token,
+                collateral_token=collateral_token,
+            )
+            prefix = "flash_order"
+            details = {
+                "market": market,
+                "side": side,
+                "size": trade_condition.size,
+                "leverage": trade_condition.leverage,
+                "payoutTokenSymbol": payout_token,
+                "collateralTokenSymbol": collateral_token,
+                "user_id": user_id,
+            }
+
+        if not isinstance(resp, dict):
+            return dict(_ERR_UNEXPECTED_RESPONSE)
+        if not wrap_confirmation or not resp.get("success"):
+            return resp
+
+        return {
+            "status": "confirmation_required",
+            "provider": "flash",
+            "flow": "perp_leverage",
+            "operation": "close" if action == "close" else "open",
+            "confirmation_id": _make_cid(prefix, market),
+            "unsigned_tx_b64": resp.get("unsigned_tx_b64") or resp.get("transaction"),
+            "details": details,
+        }
 
     def _handle_get_leverage_positions(self, task: AgentTask) -> Dict[str, Any]:
         """Handle a get_leverage_positions task."""
         user_id = task.content.get("user_id")
         if not user_id:
-            return {"error": "User ID required", "status": "error"}
+            return dict(_ERR_USER_REQUIRED)
 
         positions = self.leverage_trade_manager.get_user_positions(user_id)
         return {"success": True, "positions": positions}
 
+    def _handle_get_trade_history(self, task: AgentTask) -> Dict[str, Any]:
+        """Handle a get_trade_history task."""
+        user_id = task.content.get("user_id")
+        if not user_id:
+            return dict(_ERR_USER_REQUIRED)
+
+        return self.get_trade_history(
+            user_id=user_id,
+            trade_type=task.content.get("trade_type", "leverage"),
+            limit=task.content.get("limit", 50),
+            start_time=task.content.get("start_time"),
+            end_time=task.content.get("end_time"),
+        )
+
     def _handle_update_leverage_trade(self, task: AgentTask) -> Dict[str, Any]:
         """Handle an update_leverage_trade task."""
         trade_id = task.content.get("trade_id")
         user_id = task.content.get("user_id")
         updates = task.content.get("updates", {})
 
-        if not all([trade_id, user_id, updates]):
-            return {"error": "Missing required parameters", "status": "error"}
+        if not trade_id:
+            return dict(_ERR_NO_TRADE_ID)
+        if not user_id:
+            return dict(_ERR_NO_UPDATE_USER_ID)
+        if not updates:
+            return dict(_ERR_NO_UPDATES)
 
         return self.leverage_trade_manager.update_trade_condition(
             user_id=user_id, trade_id=trade_id, updates=updates
@@ -6,11 +6,14 @@ with advanced conditional order capabilities and user-friendly interactions.
 """
 
 import re
+import heapq
 import json
+import math
 import time
 import logging
 import os
-from typing import Dict, List, Any, Optional, Union
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
 try:
@@ -24,6 +27,31 @@ try:
 except Exception:  # pragma: no cover
     FlashHelperClient = None  # type: ignore
 
+_MARKET_MAP = {
+    "btc": "BTC-PERP",
+    "bitcoin": "BTC-PERP",
+    "eth": "ETH-PERP",
+    "ethereum": "ETH-PERP",
+    "sol": "SOL-PERP",
+    "solana": "SOL-PERP",
+}
+_PRICE = r"\$?(?P<{}>\d+(?:,\d{{3}})*(?:\.\d+)?)"
+# Every field parse_trade_request extracts, matched in one finditer pass; the
+# named group that matched (m.lastgroup) says which field it is. Side is a
+# prefix match so "shorting"/"longing" still count but "along" does not.
+_RE_TRADE_FIELDS = re.compile(
+    r"(?P<leverage>\d+)x"
+    r"|\b(?P<market>btc|bitcoin|eth|ethereum|sol|solana)\b"
+    r"|\b(?P<side>long|short)"
+    r"|when price falls (?:below|under) " + _PRICE.format("price_below")
+    + r"|when price rises (?:above|over) " + _PRICE.format("price_above")
+    + r"|close at around " + _PRICE.format("take_profit")
+    + r"|stop loss at " + _PRICE.format("stop_loss")
+)
+_ENTRY_FIELDS = ("price_below", "price_above")
+_EXIT_FIELDS = ("take_profit", "stop_loss")
+
+
 class LeverageTradeCondition:
     """
     Represents a conditional leverage trade with advanced risk management.
@@ -75,6 +103,14 @@ class LeverageTradeCondition:
         self.exit_condition = exit_condition or {}
         self.expiry = expiry or datetime.now() + timedelta(days=30)
 
+        # Trigger prices flattened to floats for the per-tick checks; an unset
+        # (or zero) trigger gets an infinite sentinel that can never be crossed
+        self._entry_always = not self.entry_condition
+        self._price_below = self.entry_condition.get("price_below") or -math.inf
+        self._price_above = self.entry_condition.get("price_above") or math.inf
+        self._take_profit = self.exit_condition.get("take_profit") or math.inf
+        self._stop_loss = self.exit_condition.get("stop_loss") or -math.inf
+
         # Margin state placeholders (protocol-agnostic)
         self.initial_margin_ratio = 0.0
         self.maintenance_margin_ratio = 0.0
@@ -107,18 +143,11 @@ class LeverageTradeCondition:
         Returns:
             Boolean indicating if entry conditions are satisfied
         """
-        if not self.entry_condition:
-            return True
-
-        price_below = self.entry_condition.get("price_below")
-        price_above = self.entry_condition.get("price_above")
-
-        if price_below and current_price < price_below:
-            return True
-        if price_above and current_price > price_above:
-            return True
-
-        return False
+        return (
+            self._entry_always
+            or current_price < self._price_below
+            or current_price > self._price_above
+        )
 
     def is_exit_condition_met(self, current_price: float) -> bool:
         """
@@ -130,18 +159,7 @@ class LeverageTradeCondition:
         Returns:
             Boolean indicating if exit conditions are satisfied
         """
-        if not self.exit_condition:
-            return False
-
-        take_profit = self.exit_condition.get("take_profit")
-        stop_loss = self.exit_condition.get("stop_loss")
-
-        if take_profit and current_price >= take_profit:
-            return True
-        if stop_loss and current_price <= stop_loss:
-            return True
-
-        return False
+        return current_price >= self._take_profit or current_price <= self._stop_loss
 
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -217,6 +235,18 @@ class LeverageTradeManager:
         self.min_margin_ratio = min_margin_ratio
         self.logger = logger or logging.getLogger(__name__)
         self.active_trades: Dict[str, Dict[str, LeverageTradeCondition]] = {}
+        # Same trades keyed by market, so a price tick only visits that market's trades
+        self._trades_by_market: Dict[
+            str, Dict[Tuple[str, str], LeverageTradeCondition]
+        ] = defaultdict(dict)
+        # Per-market trigger heaps of (sort price, (user_id, trade_id)); the top
+        # is always the next trade to fire, so a tick only touches crossed
+        # triggers. "Below" heaps store the negated price to act as max-heaps.
+        # Entries for trades no longer pending/active are dropped when popped.
+        self._entry_below_heap: Dict[str, List[tuple]] = defaultdict(list)
+        self._entry_above_heap: Dict[str, List[tuple]] = defaultdict(list)
+        self._take_profit_heap: Dict[str, List[tuple]] = defaultdict(list)
+        self._stop_loss_heap: Dict[str, List[tuple]] = defaultdict(list)
         self.position_risk: Dict[str, Dict[str, float]] = {}
         self.active_limit_orders: Dict[str, Dict[str, Any]] = {}
 
@@ -335,65 +365,29 @@ class LeverageTradeManager:
         # Normalize request
         request = request.lower()
 
-        # Extract market (token/cryptocurrency)
-        markets = {
-            "btc": "BTC-PERP",
-            "bitcoin": "BTC-PERP",
-            "eth": "ETH-PERP",
-            "ethereum": "ETH-PERP",
-            "sol": "SOL-PERP",
-            "solana": "SOL-PERP",
-        }
-
-        # Determine market
-        market_match = next((markets[m] for m in markets if m in request), None)
-        if not market_match:
-            return None
-
-        # Determine side
-        side = "long" if "long" in request else "short" if "short" in request else None
-        if not side:
+        # Scan once; the first occurrence of each field wins
+        fields = {}
+        for match in _RE_TRADE_FIELDS.finditer(request):
+            name = match.lastgroup
+            if name not in fields:
+                fields[name] = match.group(name)
+
+        # Determine market and side
+        market_match = _MARKET_MAP.get(fields.get("market"))
+        side = fields.get("side")
+        if not market_match or not side:
             return None
 
         # Extract leverage
-        leverage_match = re.search(r"(\d+)x", request)
-        leverage = float(leverage_match.group(1)) if leverage_match else 3.0
-
-        # Entry and exit conditions
-        entry_condition = {}
-        exit_condition = {}
+        leverage = float(fields["leverage"]) if "leverage" in fields else 3.0
 
-        # Price conditions
-        price_below_match = re.search(
-            r"when price falls (below|under) \$?(\d+(?:,\d{3})*(?:\.\d+)?)", request
-        )
-        price_above_match = re.search(
-            r"when price rises (above|over) \$?(\d+(?:,\d{3})*(?:\.\d+)?)", request
-        )
-
-        if price_below_match:
-            price = float(price_below_match.group(2).replace(",", ""))
-            entry_condition["price_below"] = price
-
-        if price_above_match:
-            price = float(price_above_match.group(2).replace(",", ""))
-            entry_condition["price_above"] = price
-
-        # Take profit and stop loss
-        take_profit_match = re.search(
-            r"close at around \$?(\d+(?:,\d{3})*(?:\.\d+)?)", request
-        )
-        stop_loss_match = re.search(
-            r"stop loss at \$?(\d+(?:,\d{3})*(?:\.\d+)?)", request
-        )
-
-        if take_profit_match:
-            price = float(take_profit_match.group(1).replace(",", ""))
-            exit_condition["take_profit"] = price
-
-        if stop_loss_match:
-            price = float(stop_loss_match.group(1).replace(",", ""))
-            exit_condition["stop_loss"] = price
+        # Entry (price) and exit (take profit / stop loss) conditions
+        entry_condition = {
+            k: float(fields[k].replace(",", "")) for k in _ENTRY_FIELDS if k in fields
+        }
+        exit_condition = {
+            k: float(fields[k].replace(",", "")) for k in _EXIT_FIELDS if k in fields
+        }
 
         # Create trade condition
         trade_condition = LeverageTradeCondition(
@@ -407,6 +401,29 @@ class LeverageTradeManager:
 
         return trade_condition
 
+    def validate_and_parse(
+        self, user_id: str, request: str, portfolio: Dict[str, Any]
+    ) -> tuple:
+        """
+        Parse a trade request and run the risk checks in one call.
+
+        Args:
+            user_id: User identifier
+            request: Natural language trade request
+            portfolio: User's portfolio data
+
+        Returns:
+            (trade_condition, error) where error is None when the trade passes
+        """
+        trade_condition = self.parse_trade_request(user_id=user_id, request=request)
+        if not trade_condition:
+            return None, "Failed to parse trade request"
+
+        if not self._check_risk_limits(user_id, trade_condition, portfolio):
+            return trade_condition, "Trade exceeds risk limits"
+
+        return trade_condition, None
+
     def add_trade_condition(
         self, trade_condition: LeverageTradeCondition
     ) -> Dict[str, Any]:
@@ -431,6 +448,10 @@ class LeverageTradeManager:
         # Add trade condition
         user_trades[trade_condition.id] = trade_condition
         self.active_trades[trade_condition.user_id] = user_trades
+        self._trades_by_market[trade_condition.market][
+            (trade_condition.user_id, trade_condition.id)
+        ] = trade_condition
+        self._index_entry(trade_condition)
 
         # Optional: Persist to memory system
         if self.memory_system:
@@ -573,91 +594,207 @@ class LeverageTradeManager:
             List of trade execution results
         """
         execution_results: List[Dict[str, Any]] = []
+        if not self._trades_by_market:
+            # Nothing to trigger; don't copy the price map or fetch any prices
+            return execution_results
         prices = dict(current_market_prices or {})
-
-        for user_id, user_trades in self.active_trades.items():
-            positions = []  # Position risk can be integrated from Flash positions if needed
-
-            for trade_id, trade_condition in list(user_trades.items()):
-                market_name = trade_condition.market
-                market_price = prices.get(market_name)
-                if market_price is None:
-                    # Default to Flash/Pyth price for *-PERP markets
-                    if "-PERP" in (market_name or "").upper():
-                        fetched = self.get_flash_price(market_name)
-                        if fetched is not None:
-                            market_price = fetched
-                            prices[market_name] = fetched
-                        else:
-                            # Can't price this market; skip
-                            continue
-                    else:
-                        # No price available and not a perp: skip
+        # One timestamp for every trade opened or closed on this tick
+        now = datetime.now()
+
+        for market_name, market_trades in list(self._trades_by_market.items()):
+            if not market_trades:
+                continue
+
+            market_price = prices.get(market_name)
+            if market_price is None:
+                # Default to Flash/Pyth price for *-PERP markets
+                if "-PERP" in (market_name or "").upper():
+                    fetched = self.get_flash_price(market_name)
+                    if fetched is None:
+                        # Can't price this market; skip
                         continue
-
-                # Update market price in trade condition
+                    market_price = fetched
+                    prices[market_name] = fetched
+                else:
+                    # No price available and not a perp: skip
+                    continue
+
+            # Pending trades whose entry trigger this price crosses
+            fired = self._pop_crossed(
+                self._entry_below_heap[market_name], -market_price, strict=True
+            )
+            fired += self._pop_crossed(
+                self._entry_above_heap[market_name], market_price, strict=True
+            )
+            for key, popped in self._group_by_trade(fired).items():
+                trade_condition = market_trades.get(key)
+                if (
+                    trade_condition is None
+                    or trade_condition.status != "pending"
+                    or not trade_condition.is_entry_condition_met(market_price)
+                ):
+                    continue
+                user_id, trade_id = key
                 trade_condition.market_price = market_price
 
-                # Check if we need to adjust existing position
-                existing_position = next(
-                    (
-                        pos
-                        for pos in positions
-                        if pos["market"] == trade_condition.market
-                    ),
-                    None,
+                # Execute trade via Flash order endpoint
+                side = 'buy' if trade_condition.side in ('long', 'buy') else 'sell'
+                trade_result = self._flash_order(
+                    market=trade_condition.market,
+                    side=side,
+                    size=min(trade_condition.size, trade_condition.size),
+                    leverage=min(trade_condition.leverage, self.max_leverage),
+                    reduce_only=False,
                 )
 
-                if existing_position:
-                    # If we had position details, we could update tracking here
-                    if trade_condition.status == "open" and trade_condition.is_exit_condition_met(market_price):
-                        trade_result = self._flash_close(trade_condition.market, size=trade_condition.size)
-                        if trade_result.get("success"):
-                            trade_condition.status = "closed"
-                            trade_condition.closed_at = datetime.now()
-
-                # For new trades, check entry conditions and risk
-                elif (
-                    trade_condition.status == "pending"
-                    and trade_condition.is_entry_condition_met(market_price)
-                ):
-                    # Execute trade via Flash order endpoint
-                    side = 'buy' if trade_condition.side in ('long', 'buy') else 'sell'
-                    trade_result = self._flash_order(
-                        market=trade_condition.market,
-                        side=side,
-                        size=min(trade_condition.size, trade_condition.size),
-                        leverage=min(trade_condition.leverage, self.max_leverage),
-                        reduce_only=False,
-                    )
-
-                    if trade_result.get("success"):
-                        trade_condition.status = "active"
-                        trade_condition.executed_at = datetime.now()
-
-                    execution_results.append(
-                        {"trade_id": trade_id, "result": trade_result}
-                    )
-
-                # Check exit condition
+                if trade_result.get("success"):
+                    trade_condition.status = "active"
+                    trade_condition.executed_at = now
+                    self._index_exit(trade_condition)
+                else:
+                    # Retry on the next tick that still satisfies the entry
+                    self._requeue(popped)
+
+                execution_results.append(
+                    {"trade_id": trade_id, "result": trade_result}
+                )
+
+            # Active trades (including ones opened above) whose exit trigger is crossed
+            fired = self._pop_crossed(
+                self._take_profit_heap[market_name], market_price, strict=False
+            )
+            fired += self._pop_crossed(
+                self._stop_loss_heap[market_name], -market_price, strict=False
+            )
+            for key, popped in self._group_by_trade(fired).items():
+                trade_condition = market_trades.get(key)
                 if (
-                    trade_condition.status == "active"
-                    and trade_condition.is_exit_condition_met(market_price)
+                    trade_condition is None
+                    or trade_condition.status != "active"
+                    or not trade_condition.is_exit_condition_met(market_price)
                 ):
-                    # Close trade using Flash close endpoint
-                    close_result = self._flash_close(trade_condition.market, size=trade_condition.size)
+                    continue
+                user_id, trade_id = key
+                trade_condition.market_price = market_price
+
+                # Close trade using Flash close endpoint
+                close_result = self._flash_close(trade_condition.market, size=trade_condition.size)
 
-                    if close_result.get("success"):
-                        trade_condition.status = "closed"
-                        trade_condition.closed_at = datetime.now()
-                        del user_trades[trade_id]
+                if close_result.get("success"):
+                    trade_condition.status = "closed"
+                    trade_condition.closed_at = now
+                    self._remove_trade(user_id, trade_id, market_name)
+                else:
+                    self._requeue(popped)
 
-                    execution_results.append(
-                        {"trade_id": trade_id, "result": close_result}
-                    )
+                execution_results.append(
+                    {"trade_id": trade_id, "result": close_result}
+                )
 
         return execution_results
 
+    def _index_entry(self, trade_condition: LeverageTradeCondition) -> None:
+        """Queue a pending trade on its market's entry triggers."""
+        key = (trade_condition.user_id, trade_condition.id)
+        market = trade_condition.market
+        entry = trade_condition.entry_condition
+        if not entry:
+            # No entry condition: any price is "above" -inf, so it fires on the next tick
+            heapq.heappush(self._entry_above_heap[market], (-math.inf, key))
+            return
+        price_below = entry.get("price_below")
+        price_above = entry.get("price_above")
+        if price_below:
+            heapq.heappush(self._entry_below_heap[market], (-price_below, key))
+        if price_above:
+            heapq.heappush(self._entry_above_heap[market], (price_above, key))
+
+    def _index_exit(self, trade_condition: LeverageTradeCondition) -> None:
+        """Queue an active trade on its market's take-profit/stop-loss triggers."""
+        key = (trade_condition.user_id, trade_condition.id)
+        market = trade_condition.market
+        exit_condition = trade_condition.exit_condition
+        take_profit = exit_condition.get("take_profit")
+        stop_loss = exit_condition.get("stop_loss")
+        if take_profit:
+            heapq.heappush(self._take_profit_heap[market], (take_profit, key))
+        if stop_loss:
+            heapq.heappush(self._stop_loss_heap[market], (-stop_loss, key))
+
+    @staticmethod
+    def _pop_crossed(heap: List[tuple], bound: float, strict: bool) -> List[tuple]:
+        """Pop every (price, key) entry whose price is below (or at, if not strict) bound."""
+        fired = []
+        while heap and (heap[0][0] < bound if strict else heap[0][0] <= bound):
+            fired.append((heap, heapq.heappop(heap)))
+        return fired
+
+    @staticmethod
+    def _group_by_trade(fired: List[tuple]) -> Dict[Tuple[str, str], List[tuple]]:
+        """Group popped (heap, entry) pairs by trade key, in firing order."""
+        grouped: Dict[Tuple[str, str], List[tuple]] = {}
+        for heap, entry in fired:
+            grouped.setdefault(entry[1], []).append((heap, entry))
+        return grouped
+
+    @staticmethod
+    def _requeue(popped: List[tuple]) -> None:
+        """Put popped trigger entries back after a failed Flash call."""
+        for heap, entry in popped:
+            heapq.heappush(heap, entry)
+
+    def _remove_trade(self, user_id: str, trade_id: str, market: str) -> None:
+        """Drop a trade from active_trades and the per-market index."""
+        self.active_trades.get(user_id, {}).pop(trade_id, None)
+        market_trades = self._trades_by_market.get(market)
+        if market_trades is not None:
+            market_trades.pop((user_id, trade_id), None)
+            if not market_trades:
+                # Nothing left to trigger; drop any stale heap entries too
+                del self._trades_by_market[market]
+                for heaps in (
+                    self._entry_below_heap,
+                    self._entry_above_heap,
+                    self._take_profit_heap,
+                    self._stop_loss_heap,
+                ):
+                    heaps.pop(market, None)
+            else:
+                self._compact_triggers(market)
+
+    def _compact_triggers(self, market: str) -> None:
+        """
+        Rebuild a market's trigger heaps without stale entries once they dominate.
+
+        Triggers that are never crossed (the unused side of a two-sided entry,
+        the stop loss of a trade closed at take profit) are not popped, so they
+        are only cleaned up here. Each live trade holds at most two entries, so
+        anything well past that is stale; rebuilding then keeps the heaps
+        bounded at amortized O(1) per removed trade.
+        """
+        market_trades = self._trades_by_market.get(market, {})
+        heaps = (
+            (self._entry_below_heap, "pending"),
+            (self._entry_above_heap, "pending"),
+            (self._take_profit_heap, "active"),
+            (self._stop_loss_heap, "active"),
+        )
+        total = sum(len(by_market.get(market, ())) for by_market, _ in heaps)
+        if total <= 4 * len(market_trades) + 64:
+            return
+
+        for by_market, status in heaps:
+            heap = by_market.get(market)
+            if not heap:
+                continue
+            live = []
+            for entry in heap:
+                trade_condition = market_trades.get(entry[1])
+                if trade_condition is not None and trade_condition.status == status:
+                    live.append(entry)
+            heapq.heapify(live)
+            by_market[market] = live
+
     # --- Flash helpers ---
     def _post_flash(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         try:
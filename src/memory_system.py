@@ -8,6 +8,7 @@ from chromadb.utils import embedding_functions
 import uuid
 import re
 import logging
+import threading
 
 # Configure logging for the memory system
 logger = logging.getLogger("MemorySystem")
@@ -27,16 +28,32 @@ class MemorySystem:
     - Automatic memory maintenance
     """
 
-    def __init__(self, chroma_db_path: str, user_profile_system: "UserProfileSystem"):
-        """Initialize the memory system with ChromaDB."""
-        self.chroma_client = chromadb.PersistentClient(path=chroma_db_path)
-        self.user_profile_system = user_profile_system
+    # Attributes populated by warm(); reads before then block until it finishes
+    _WARM_ATTRS = frozenset({
+        "chroma_client", "embedding_function", "global_collection",
+        "system_collection", "version_collection", "user_collections",
+    })
+
+    def __init__(
+        self,
+        chroma_db_path: str,
+        user_profile_system: "UserProfileSystem",
+        warm: bool = True,
+    ):
+        """Initialize the memory system with ChromaDB.
 
-        # Create embedding function
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        Args:
+            chroma_db_path: Directory for the persistent ChromaDB store
+            user_profile_system: User profile system
+            warm: Open ChromaDB immediately. Pass False to call warm() later,
+                e.g. from a background thread.
+        """
+        self.chroma_db_path = chroma_db_path
+        self.user_profile_system = user_profile_system
 
-        # Initialize collections
-        self._initialize_collections()
+        self._ready = threading.Event()
+        self._warm_lock = threading.Lock()
+        self._warm_error: Optional[BaseException] = None
 
         # Time-based decay settings
         self.short_term_ttl = 60 * 60 * 24  # 1 day in seconds
@@ -46,6 +63,47 @@ class MemorySystem:
         self.version_history = {}
         self.current_version = "1.0.0"
 
+        if warm:
+            self.warm()
+
+    def warm(self):
+        """Open the ChromaDB client, embedding function and collections."""
+        with self._warm_lock:
+            if self._ready.is_set():
+                return
+            try:
+                self.chroma_client = chromadb.PersistentClient(path=self.chroma_db_path)
+
+                # Create embedding function
+                self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+                # Initialize collections
+                self._initialize_collections()
+                logger.info("Memory system ChromaDB store is ready")
+            except Exception as e:
+                self._warm_error = e
+                logger.error(f"Failed to warm up memory system: {str(e)}")
+                raise
+            finally:
+                self._ready.set()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until warm() has finished; returns False on timeout."""
+        return self._ready.wait(timeout)
+
+    def __getattr__(self, name: str):
+        # Only reached when normal lookup fails, i.e. a ChromaDB attribute is
+        # read before warm() has set it.
+        ready = self.__dict__.get("_ready")
+        if name in MemorySystem._WARM_ATTRS and ready is not None:
+            ready.wait()
+            if name in self.__dict__:
+                return self.__dict__[name]
+            error = self.__dict__.get("_warm_error")
+            if error is not None:
+                raise RuntimeError(f"Memory system failed to initialize: {error}") from error
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
     def _initialize_collections(self):
         """Initialize ChromaDB collections for each memory layer."""
         # Global long-term memory collection
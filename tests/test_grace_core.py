@@ -0,0 +1,152 @@
+"""Tests for the OI helper rate limiting in grace_core (_TokenBucket, AIMD)."""
+
+import pytest
+
+from src.grace_core import GraceCore, _TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def drain(bucket):
+    taken = 0
+    while bucket.try_acquire():
+        taken += 1
+    return taken
+
+
+def test_bucket_starts_full_at_burst(clock):
+    bucket = _TokenBucket(rate=10, burst=20, clock=clock)
+    assert drain(bucket) == 20
+    assert bucket.try_acquire() is False
+
+
+def test_empty_bucket_reports_retry_after(clock):
+    bucket = _TokenBucket(rate=10, burst=20, clock=clock)
+    drain(bucket)
+
+    assert bucket.retry_after() == 0.1
+    assert bucket.retry_after(5) == 0.5
+    clock.advance(0.05)
+    assert bucket.retry_after() == 0.05
+    assert bucket.try_acquire() is False
+
+
+def test_refill_is_proportional_to_elapsed_time(clock):
+    bucket = _TokenBucket(rate=10, burst=20, clock=clock)
+    drain(bucket)
+
+    clock.advance(0.5)
+    assert drain(bucket) == 5
+    clock.advance(0.1)
+    assert bucket.try_acquire() is True
+    assert bucket.retry_after() == 0.1
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = _TokenBucket(rate=10, burst=20, clock=clock)
+    drain(bucket)
+
+    clock.advance(3600)
+    assert drain(bucket) == 20
+
+
+def test_multi_token_requests_are_capped_at_burst(clock):
+    bucket = _TokenBucket(rate=10, burst=20, clock=clock)
+    assert bucket.try_acquire(50) is True
+    assert bucket.try_acquire() is False
+    assert bucket.retry_after(50) == 2.0
+
+
+def test_backoff_halves_rate_down_to_a_floor(clock):
+    bucket = _TokenBucket(rate=16, burst=16, clock=clock)
+    rates = []
+    for _ in range(6):
+        bucket.backoff()
+        rates.append(bucket.rate)
+    assert rates == [8.0, 4.0, 2.0, 1.0, 1.0, 1.0]
+
+
+def test_backoff_slows_refill(clock):
+    bucket = _TokenBucket(rate=10, burst=20, clock=clock)
+    drain(bucket)
+    bucket.backoff()
+
+    clock.advance(1.0)
+    assert drain(bucket) == 5
+    assert bucket.retry_after() == 0.2
+
+
+def test_recover_adds_a_tenth_of_base_rate_up_to_base(clock):
+    bucket = _TokenBucket(rate=10, burst=20, clock=clock)
+    bucket.backoff()
+    bucket.backoff()
+    assert bucket.rate == 2.5
+
+    rates = []
+    for _ in range(10):
+        bucket.recover()
+        rates.append(bucket.rate)
+    assert rates == pytest.approx([3.5, 4.5, 5.5, 6.5, 7.5, 8.5, 9.5, 10.0, 10.0, 10.0])
+
+
+def make_core(**buckets):
+    core = object.__new__(GraceCore)
+    core._rate_buckets = buckets
+    return core
+
+
+def test_acquire_rate_token_returns_payload_when_empty(clock):
+    bucket = _TokenBucket(rate=4, burst=2, clock=clock)
+    core = make_core(gmgn_price=bucket)
+
+    assert core._acquire_rate_token("gmgn_price") is None
+    assert core._acquire_rate_token("gmgn_price") is None
+    assert core._acquire_rate_token("gmgn_price") == {
+        "error": "rate_limited",
+        "retry_after": 0.25,
+        "status": "error",
+    }
+    clock.advance(0.25)
+    assert core._acquire_rate_token("gmgn_price") is None
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        {"status_code": 429},
+        {"error": "HTTP 429 Too Many Requests"},
+        {"error": "Rate limit exceeded"},
+        {"error": "rate_limited"},
+    ],
+)
+def test_throttled_results_back_off(clock, result):
+    bucket = _TokenBucket(rate=8, burst=16, clock=clock)
+    core = make_core(chain_status=bucket)
+
+    core._record_rate_outcome("chain_status", result)
+    assert bucket.rate == 4.0
+
+
+def test_successful_results_recover(clock):
+    bucket = _TokenBucket(rate=8, burst=16, clock=clock)
+    core = make_core(chain_status=bucket)
+    bucket.backoff()
+
+    core._record_rate_outcome("chain_status", {"status": "success", "price": 1.0})
+    assert bucket.rate == pytest.approx(4.8)
+    core._record_rate_outcome("chain_status", "not a dict")
+    assert bucket.rate == pytest.approx(5.6)
@@ -0,0 +1,171 @@
+"""Tests comparing the NumPy CandleSeries buffers with the original list-of-candles logic."""
+
+import random
+
+import numpy as np
+import pytest
+
+from src.leverage_candles_aggregator import (
+    INTERVAL_SECONDS,
+    CandleSeries,
+    LeverageCandlesAggregator,
+)
+
+
+class ListCandles:
+    """The list-based candle buffers the aggregator used before CandleSeries."""
+
+    def __init__(self, max_candles):
+        self.max_candles = max_candles
+        self.buffers = {}
+
+    def ingest_tick(self, symbol, price, ts_ms):
+        for interval_str, secs in INTERVAL_SECONDS.items():
+            bucket_ms = (ts_ms // (secs * 1000)) * (secs * 1000)
+            series = self.buffers.setdefault((symbol, interval_str), [])
+            if not series:
+                series.append(self._candle(bucket_ms, price))
+                continue
+            last = series[-1]
+            if last["ts"] == bucket_ms:
+                last["high"] = max(last["high"], price)
+                last["low"] = min(last["low"], price)
+                last["close"] = price
+            elif last["ts"] < bucket_ms:
+                series.append(self._candle(bucket_ms, price))
+                if len(series) > self.max_candles:
+                    del series[: len(series) - self.max_candles]
+
+    def get_candles(self, symbol, interval, ts_from_ms=None, ts_to_ms=None):
+        return [
+            dict(c)
+            for c in self.buffers.get((symbol, interval), [])
+            if not (ts_from_ms and c["ts"] < ts_from_ms)
+            and not (ts_to_ms and c["ts"] > ts_to_ms)
+        ]
+
+    @staticmethod
+    def _candle(ts, price):
+        return {"ts": ts, "open": price, "high": price, "low": price, "close": price, "volume": 0.0}
+
+
+@pytest.fixture(scope="module")
+def stopped_aggregator():
+    aggregator = LeverageCandlesAggregator(adapter_base="http://127.0.0.1:9", use_ws=False)
+    aggregator.stop()
+    return aggregator
+
+
+@pytest.fixture
+def aggregator(stopped_aggregator):
+    stopped_aggregator.buffers.clear()
+    stopped_aggregator.max_candles_per_series = 2000
+    return stopped_aggregator
+
+
+def feed(aggregator, reference, ticks):
+    for symbol, price, ts_ms in ticks:
+        aggregator._ingest_tick(symbol, price, ts_ms)
+        reference.ingest_tick(symbol, price, ts_ms)
+
+
+def random_ticks(seed, count, start_ms=1_700_000_000_000):
+    rng = random.Random(seed)
+    ts_ms = start_ms
+    price = 100.0
+    ticks = []
+    for _ in range(count):
+        # Mostly sub-second steps, with jumps across minute and hour boundaries
+        ts_ms += rng.choice((37, 250, 999, 1000, 1001, 59_999, 60_000, 3_600_000))
+        price = max(0.01, price + rng.uniform(-2.0, 2.0))
+        ticks.append(("SOL", price, ts_ms))
+    return ticks
+
+
+@pytest.mark.parametrize("max_candles", [1, 2, 5, 64, 100])
+def test_matches_list_candles_across_boundaries_and_trims(aggregator, max_candles):
+    aggregator.max_candles_per_series = max_candles
+    reference = ListCandles(max_candles)
+    ticks = random_ticks(seed=max_candles, count=3000)
+    feed(aggregator, reference, ticks)
+
+    for interval in INTERVAL_SECONDS:
+        expected = reference.get_candles("SOL", interval)
+        assert aggregator.get_candles("SOL-PERP", interval) == expected
+        assert len(expected) <= max_candles
+
+
+def test_matches_list_candles_at_each_step(aggregator):
+    aggregator.max_candles_per_series = 3
+    reference = ListCandles(3)
+    for tick in random_ticks(seed=7, count=500):
+        feed(aggregator, reference, [tick])
+        for interval in ("1S", "1", "60"):
+            assert aggregator.get_candles("SOL", interval) == reference.get_candles("SOL", interval)
+
+
+def test_windowing_matches_list_filter(aggregator):
+    aggregator.max_candles_per_series = 50
+    reference = ListCandles(50)
+    ticks = random_ticks(seed=3, count=2000)
+    feed(aggregator, reference, ticks)
+
+    series_ts = [c["ts"] for c in reference.get_candles("SOL", "1")]
+    bounds = [None, 0, series_ts[0] - 1, series_ts[0], series_ts[10], series_ts[10] + 1,
+              series_ts[-1], series_ts[-1] + 1]
+    for ts_from in bounds:
+        for ts_to in bounds:
+            assert aggregator.get_candles("SOL", "1", ts_from, ts_to) == reference.get_candles(
+                "SOL", "1", ts_from, ts_to
+            )
+
+
+def test_symbols_are_kept_apart(aggregator):
+    aggregator.max_candles_per_series = 10
+    reference = ListCandles(10)
+    rng = random.Random(11)
+    ticks = [
+        (rng.choice(("SOL", "ETH")), rng.uniform(1, 100), 1_700_000_000_000 + i * 700)
+        for i in range(1000)
+    ]
+    feed(aggregator, reference, ticks)
+
+    for symbol in ("SOL", "ETH"):
+        assert aggregator.get_candles(symbol, "1S") == reference.get_candles(symbol, "1S")
+
+
+def test_out_of_order_ticks_are_ignored(aggregator):
+    reference = ListCandles(aggregator.max_candles_per_series)
+    ticks = [("SOL", 10.0, 120_000), ("SOL", 11.0, 60_000), ("SOL", 12.0, 121_000)]
+    feed(aggregator, reference, ticks)
+
+    assert aggregator.get_candles("SOL", "1") == reference.get_candles("SOL", "1")
+    assert aggregator.get_candles("SOL", "1") == [
+        {"ts": 120_000, "open": 10.0, "high": 12.0, "low": 10.0, "close": 12.0, "volume": 0.0}
+    ]
+
+
+def test_get_candles_np_returns_private_copies(aggregator):
+    feed(aggregator, ListCandles(10), random_ticks(seed=5, count=50))
+
+    columns = aggregator.get_candles_np("SOL", "1S")
+    assert list(columns) == list(CandleSeries._COLUMNS)
+    assert columns["ts"].dtype == np.int64
+    assert np.all(np.diff(columns["ts"]) > 0)
+    columns["close"][:] = -1.0
+    assert all(c["close"] > 0 for c in aggregator.get_candles("SOL", "1S"))
+
+
+def test_missing_series_is_empty(aggregator):
+    assert aggregator.get_candles("BTC-PERP", "1") == []
+    assert aggregator.get_candles_np("BTC-PERP", "1") == {}
+
+
+def test_series_growth_and_trim_keep_newest_rows():
+    series = CandleSeries(max_candles=100, ts=0, price=1.0)
+    for i in range(1, 1000):
+        series.append(i, float(i))
+        ts, *_ = series.window()
+        assert ts.tolist() == list(range(max(0, i - 99), i + 1))
+        # Capacity never exceeds twice the series length
+        assert len(series.ts) <= 200
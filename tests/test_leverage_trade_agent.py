@@ -0,0 +1,150 @@
+"""Tests for LeverageTradeAgent's trade history cache and in-flight fetch sharing."""
+
+import threading
+import time
+
+import pytest
+
+from src.leverage_trade_agent import LeverageTradeAgent
+
+
+class SlowHistoryManager:
+    """Manager stub whose get_trade_history blocks until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.error = None
+        self._lock = threading.Lock()
+
+    def get_trade_history(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+        self.entered.set()
+        assert self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return {"trades": [{"id": "t1"}], "total_trades": 1}
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+@pytest.fixture
+def manager():
+    return SlowHistoryManager()
+
+
+@pytest.fixture
+def agent(manager):
+    # No TTL, so every completed fetch is stale and only in-flight sharing can dedupe
+    return LeverageTradeAgent(
+        agent_id="leverage_trade_agent",
+        leverage_trade_manager=manager,
+        config={"history_cache_ttl": 0.0},
+    )
+
+
+def call_concurrently(target, count):
+    results, errors = [None] * count, [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except BaseException as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_followers(agent, manager):
+    assert manager.entered.wait(timeout=5)
+    assert len(agent._history_inflight) == 1
+    # Give the other callers time to find the in-flight fetch and block on it
+    time.sleep(0.2)
+
+
+def test_concurrent_identical_queries_share_one_fetch(agent, manager):
+    threads, results, errors = call_concurrently(lambda: agent.get_trade_history("user"), 8)
+    wait_for_followers(agent, manager)
+    manager.release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert manager.calls == 1
+    assert errors == [None] * 8
+    assert all(r == {"success": True, "trades": [{"id": "t1"}], "total_trades": 1} for r in results)
+    # Every caller gets its own copy of the trades list
+    assert len({id(r["trades"]) for r in results}) == 8
+    assert agent._history_inflight == {}
+
+
+def test_different_queries_fetch_separately(agent, manager):
+    manager.release.set()
+    agent.get_trade_history("user", limit=10)
+    agent.get_trade_history("user", limit=20)
+    agent.get_trade_history("other", limit=10)
+
+    assert manager.calls == 3
+
+
+def test_inflight_future_is_cleared_when_fetch_raises(agent, manager, monkeypatch):
+    fetch = agent._fetch_trade_history
+
+    def failing_fetch(*args):
+        fetch(*args)
+        raise RuntimeError("fetch failed")
+
+    monkeypatch.setattr(agent, "_fetch_trade_history", failing_fetch)
+    threads, results, errors = call_concurrently(lambda: agent.get_trade_history("user"), 4)
+    wait_for_followers(agent, manager)
+    manager.release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # The leader and every caller sharing its fetch see the same error
+    assert manager.calls == 1
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert agent._history_inflight == {}
+
+    # The failed key is not stuck: the next call starts a fresh fetch
+    monkeypatch.setattr(agent, "_fetch_trade_history", fetch)
+    assert agent.get_trade_history("user")["success"] is True
+    assert manager.calls == 2
+
+
+def test_manager_error_is_returned_and_not_cached(manager):
+    agent = LeverageTradeAgent(agent_id="leverage_trade_agent", leverage_trade_manager=manager)
+    manager.error = RuntimeError("backend down")
+    manager.release.set()
+
+    result = agent.get_trade_history("user")
+    assert result["success"] is False
+    assert result["error"] == "backend down"
+    assert agent._history_inflight == {}
+
+    manager.error = None
+    assert agent.get_trade_history("user")["success"] is True
+    assert manager.calls == 2
+
+
+def test_cached_result_is_served_within_ttl(manager):
+    agent = LeverageTradeAgent(
+        agent_id="leverage_trade_agent",
+        leverage_trade_manager=manager,
+        config={"history_cache_ttl": 60.0},
+    )
+    manager.release.set()
+
+    first = agent.get_trade_history("user")
+    first["trades"].append({"id": "mutated"})
+    assert agent.get_trade_history("user")["trades"] == [{"id": "t1"}]
+    assert manager.calls == 1
+
+    agent.invalidate_trade_history("user")
+    agent.get_trade_history("user")
+    assert manager.calls == 2
@@ -0,0 +1,245 @@
+"""Tests for the per-market trigger heaps in LeverageTradeManager.execute_trades."""
+
+import itertools
+
+import pytest
+
+from src.leverage_trading_handler import LeverageTradeCondition, LeverageTradeManager
+
+MARKET = "SOL-PERP"
+_IDS = itertools.count()
+
+
+class FlashStub:
+    """Records Flash calls and answers them with a configurable success flag."""
+
+    def __init__(self):
+        self.succeed = True
+        self.orders = []
+        self.closes = []
+
+    def order(self, **kwargs):
+        self.orders.append(kwargs)
+        return {"success": self.succeed}
+
+    def close(self, market, size=None, payout_token=None):
+        self.closes.append(market)
+        return {"success": self.succeed}
+
+
+@pytest.fixture
+def flash():
+    return FlashStub()
+
+
+@pytest.fixture
+def manager(flash):
+    manager = LeverageTradeManager()
+    manager.max_positions = 10_000
+    manager._flash_order = flash.order
+    manager._flash_close = flash.close
+    return manager
+
+
+def add_trade(manager, entry=None, exit=None, user_id="user"):
+    trade = LeverageTradeCondition(
+        user_id=user_id,
+        market=MARKET,
+        side="long",
+        leverage=2,
+        entry_condition=entry,
+        exit_condition=exit,
+    )
+    # Ids are only unique per second; keep them distinct within a test
+    trade.id = f"{trade.id}_{next(_IDS)}"
+    assert manager.add_trade_condition(trade)["success"]
+    return trade
+
+
+def heap_sizes(manager):
+    return [
+        len(manager._entry_below_heap[MARKET]),
+        len(manager._entry_above_heap[MARKET]),
+        len(manager._take_profit_heap[MARKET]),
+        len(manager._stop_loss_heap[MARKET]),
+    ]
+
+
+def test_entry_below_fires_strictly_below_trigger(manager, flash):
+    trade = add_trade(manager, entry={"price_below": 100.0})
+
+    manager.execute_trades({MARKET: 100.0})
+    assert trade.status == "pending"
+    assert flash.orders == []
+
+    manager.execute_trades({MARKET: 99.99})
+    assert trade.status == "active"
+    assert len(flash.orders) == 1
+
+
+def test_entry_above_fires_strictly_above_trigger(manager, flash):
+    trade = add_trade(manager, entry={"price_above": 100.0})
+
+    manager.execute_trades({MARKET: 100.0})
+    assert trade.status == "pending"
+
+    manager.execute_trades({MARKET: 100.01})
+    assert trade.status == "active"
+
+
+def test_entry_without_condition_fires_on_next_tick(manager):
+    trade = add_trade(manager)
+
+    manager.execute_trades({MARKET: 42.0})
+    assert trade.status == "active"
+
+
+def test_exit_fires_at_take_profit_and_stop_loss_inclusive(manager, flash):
+    take = add_trade(manager, exit={"take_profit": 120.0})
+    stop = add_trade(manager, exit={"stop_loss": 80.0})
+    manager.execute_trades({MARKET: 100.0})
+    assert take.status == stop.status == "active"
+
+    manager.execute_trades({MARKET: 119.99})
+    assert take.status == "active"
+    manager.execute_trades({MARKET: 120.0})
+    assert take.status == "closed"
+
+    manager.execute_trades({MARKET: 80.01})
+    assert stop.status == "active"
+    manager.execute_trades({MARKET: 80.0})
+    assert stop.status == "closed"
+    assert len(flash.closes) == 2
+
+
+def test_entry_and_exit_can_fire_on_the_same_tick(manager, flash):
+    trade = add_trade(
+        manager, entry={"price_below": 100.0}, exit={"stop_loss": 95.0}
+    )
+
+    manager.execute_trades({MARKET: 90.0})
+    assert trade.status == "closed"
+    assert len(flash.orders) == 1
+    assert len(flash.closes) == 1
+
+
+def test_untriggered_trades_stay_queued(manager):
+    low = add_trade(manager, entry={"price_below": 50.0})
+    high = add_trade(manager, entry={"price_above": 150.0})
+
+    for price in (100.0, 60.0, 140.0):
+        manager.execute_trades({MARKET: price})
+    assert low.status == high.status == "pending"
+    assert heap_sizes(manager) == [1, 1, 0, 0]
+
+    manager.execute_trades({MARKET: 49.0})
+    assert low.status == "active"
+    assert high.status == "pending"
+    manager.execute_trades({MARKET: 151.0})
+    assert high.status == "active"
+
+
+def test_failed_entry_is_requeued_and_retried(manager, flash):
+    trade = add_trade(manager, entry={"price_below": 100.0})
+
+    flash.succeed = False
+    manager.execute_trades({MARKET: 90.0})
+    assert trade.status == "pending"
+    assert heap_sizes(manager)[0] == 1
+
+    # Not retried while the price no longer satisfies the entry
+    manager.execute_trades({MARKET: 110.0})
+    assert len(flash.orders) == 1
+
+    flash.succeed = True
+    manager.execute_trades({MARKET: 95.0})
+    assert trade.status == "active"
+    assert len(flash.orders) == 2
+
+
+def test_failed_exit_is_requeued_and_retried(manager, flash):
+    trade = add_trade(manager, exit={"take_profit": 120.0})
+    manager.execute_trades({MARKET: 100.0})
+
+    flash.succeed = False
+    manager.execute_trades({MARKET: 125.0})
+    assert trade.status == "active"
+    assert heap_sizes(manager)[2] == 1
+
+    flash.succeed = True
+    manager.execute_trades({MARKET: 121.0})
+    assert trade.status == "closed"
+
+
+def test_two_sided_entry_fires_once(manager, flash):
+    trade = add_trade(
+        manager, entry={"price_below": 90.0, "price_above": 110.0}
+    )
+
+    manager.execute_trades({MARKET: 80.0})
+    assert trade.status == "active"
+    # The crossed-out "above" trigger is stale and must not open it again
+    manager.execute_trades({MARKET: 120.0})
+    assert len(flash.orders) == 1
+
+
+def test_closed_trade_is_removed(manager):
+    trade = add_trade(manager, exit={"take_profit": 120.0})
+    manager.execute_trades({MARKET: 100.0})
+    manager.execute_trades({MARKET: 120.0})
+
+    assert trade.status == "closed"
+    assert trade.id not in manager.active_trades["user"]
+    # Last trade in the market: its index and heaps are dropped entirely
+    assert MARKET not in manager._trades_by_market
+    assert manager.execute_trades({MARKET: 1.0}) == []
+
+
+def test_closed_trade_leaves_other_trades_indexed(manager):
+    closing = add_trade(manager, exit={"take_profit": 120.0})
+    resting = add_trade(manager, entry={"price_below": 10.0})
+    manager.execute_trades({MARKET: 100.0})
+    manager.execute_trades({MARKET: 120.0})
+
+    assert closing.status == "closed"
+    assert list(manager._trades_by_market[MARKET].values()) == [resting]
+    manager.execute_trades({MARKET: 5.0})
+    assert resting.status == "active"
+
+
+def test_stale_triggers_are_compacted(manager):
+    resting = add_trade(manager, entry={"price_below": 1.0})
+
+    # Each round trip leaves its never-crossed stop loss behind in the heap
+    for _ in range(2000):
+        add_trade(manager, exit={"take_profit": 120.0, "stop_loss": 50.0})
+        manager.execute_trades({MARKET: 100.0})
+        manager.execute_trades({MARKET: 130.0})
+
+    assert len(manager._trades_by_market[MARKET]) == 1
+    assert sum(heap_sizes(manager)) <= 4 * 1 + 64 + 1
+    assert resting.status == "pending"
+    manager.execute_trades({MARKET: 0.5})
+    assert resting.status == "active"
+
+
+def test_compaction_keeps_live_triggers(manager):
+    live = [
+        add_trade(manager, exit={"take_profit": 200.0 + i, "stop_loss": 10.0})
+        for i in range(5)
+    ]
+    manager.execute_trades({MARKET: 100.0})
+    assert all(t.status == "active" for t in live)
+
+    for _ in range(200):
+        add_trade(manager, exit={"take_profit": 120.0, "stop_loss": 50.0})
+        manager.execute_trades({MARKET: 100.0})
+        manager.execute_trades({MARKET: 130.0})
+
+    keys = {(t.user_id, t.id) for t in live}
+    stop_loss_heap = manager._stop_loss_heap[MARKET]
+    assert len(stop_loss_heap) <= 4 * len(live) + 64 + 1
+    assert keys <= {key for _, key in stop_loss_heap}
+    assert keys <= {key for _, key in manager._take_profit_heap[MARKET]}
+    manager.execute_trades({MARKET: 210.0})
+    assert all(t.status == "closed" for t in live)